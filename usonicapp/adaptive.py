@@ -0,0 +1,77 @@
+"""Адаптивное измерение: грубый проход по всему диапазону и точный проход
+только в окрестности резонанса."""
+from math import sqrt
+
+import numpy as np
+from freqplan import FrequencyPlan
+from serialport import MeasuredValues
+
+
+def merge_windows(windows: list) -> list:
+    """Объединяет пересекающиеся окна частот."""
+    result = []
+    for start, stop in sorted(windows):
+        if result and start <= result[-1][1]:
+            result[-1] = (result[-1][0], max(result[-1][1], stop))
+        else:
+            result.append((start, stop))
+    return result
+
+
+def find_resonance_windows(data: MeasuredValues, margin: float) -> list:
+    """Окна частот для точного прохода по результатам грубого.
+
+    Окна строятся вокруг минимума Z, максимума R и полосы тока выше
+    I_max / sqrt(2) с запасом margin Гц с каждой стороны.
+
+    Returns:
+        list: Список пар (начальная частота, конечная частота).
+    """
+    if len(data.f) < 3:
+        return []
+    f = np.asarray(data.f, dtype=np.float64)
+    z = np.asarray(data.z, dtype=np.float64)
+    r = np.asarray(data.r, dtype=np.float64)
+    i = np.asarray(data.i, dtype=np.float64)
+
+    windows = [
+        (f[np.argmin(z)] - margin, f[np.argmin(z)] + margin),
+        (f[np.argmax(r)] - margin, f[np.argmax(r)] + margin),
+    ]
+    i_max_index = int(np.argmax(i))
+    threshold = i[i_max_index] / sqrt(2)
+    low = high = i_max_index
+    while low > 0 and i[low - 1] >= threshold:
+        low -= 1
+    while high + 1 < len(i) and i[high + 1] >= threshold:
+        high += 1
+    windows.append((f[low] - margin, f[high] + margin))
+
+    return [
+        (max(start, f[0]), min(stop, f[-1]))
+        for start, stop in merge_windows(windows)
+    ]
+
+
+def refine_plan(windows: list, step: float) -> FrequencyPlan:
+    """План частот точного прохода с шагом step внутри окон."""
+    return FrequencyPlan.from_windows(windows, step)
+
+
+def merge_values(coarse: MeasuredValues, fine: MeasuredValues, windows: list) -> MeasuredValues:  # noqa
+    """Объединяет результаты проходов: точки грубого прохода вне окон
+    дополняются точками точного прохода. Результат упорядочен по частоте.
+    Отклонение Z сохраняется, только если оно есть в обоих проходах."""
+    columns = MeasuredValues.COLUMNS
+    if all(len(data.z_std) == len(data.f) for data in (coarse, fine)):
+        columns += ('z_std',)
+    outside = np.ones(len(coarse.f), dtype=bool)
+    for start, stop in windows:
+        outside &= (coarse.f < start) | (coarse.f > stop)
+    merged = {
+        key: np.concatenate(
+            (getattr(coarse, key)[outside], getattr(fine, key)))
+        for key in columns
+    }
+    order = np.argsort(merged['f'], kind='stable')
+    return MeasuredValues(**{key: merged[key][order] for key in columns})
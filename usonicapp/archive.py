@@ -0,0 +1,174 @@
+"""Архив измерений на диске.
+
+Каждое измерение хранится в отдельном файле каталога archive: заголовок
+HEADER_DTYPE и столбцы f, z, r, x, ph, i, u, z_std фиксированной длины
+по capacity значений float64. Файл отображается в память numpy.memmap,
+поэтому вкладки, calc_stat и сохранение записи работают с
+представлениями файла, а в памяти находятся только страницы, к которым
+обращались. Число точек в заголовке обновляется при каждом добавлении,
+поэтому файл измерения читается и после аварийного завершения программы.
+"""
+from __future__ import annotations
+
+import itertools
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+from serialport import MeasuredValues
+
+basedir = os.path.dirname(__file__)
+
+MAGIC = b'USONICA1'
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('capacity', '<u8'),
+    ('size', '<u8'),
+    ('has_std', 'u1'),
+])
+# Столбцы начинаются с границы 64 байт
+HEADER_SIZE = 64
+KEYS = MeasuredValues.COLUMNS + ('z_std',)
+# Прежние файлы измерений, которые не удалось удалить при переносе в
+# файл большей длины: пока их отображают другие объекты, Windows не
+# разрешает удаление
+stale_paths: set = set()
+
+
+def remove_stale_files() -> None:
+    """Повторная попытка удалить прежние файлы измерений."""
+    for path in list(stale_paths):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            continue
+        stale_paths.discard(path)
+
+
+class ArchivedValues(MeasuredValues):
+    """MeasuredValues, столбцы которых - отображение файла архива."""
+    __slots__ = ('path', 'header')
+
+    @classmethod
+    def create(cls, path: str, capacity: int) -> ArchivedValues:
+        """Новый файл измерения на capacity точек."""
+        capacity = max(capacity, 1)
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header['magic'] = MAGIC
+        header['capacity'] = capacity
+        with open(path, 'wb') as file:
+            file.write(header.tobytes().ljust(HEADER_SIZE, b'\x00'))
+            file.truncate(HEADER_SIZE + len(KEYS) * capacity * 8)
+        return cls.open(path, 'r+')
+
+    @classmethod
+    def open(cls, path: str, mode: str = 'r') -> ArchivedValues:
+        """Отображение файла измерения. В режиме 'r' данные доступны
+        только для чтения."""
+        header = np.memmap(path, dtype=HEADER_DTYPE, mode=mode, shape=1)
+        if header['magic'][0] != MAGIC:
+            raise ValueError(f'{path}: неизвестный формат архива')
+        capacity = int(header['capacity'][0])
+        mapping = np.memmap(
+            path, dtype='<f8', mode=mode, offset=HEADER_SIZE,
+            shape=(len(KEYS), capacity))
+        values = cls.__new__(cls)
+        values.path = path
+        values.header = header
+        values.arrays = dict(zip(KEYS, mapping))
+        values.size = min(int(header['size'][0]), capacity)
+        values.has_std = bool(header['has_std'][0])
+        return values
+
+    def __repr__(self) -> str:
+        return f'ArchivedValues({self.path!r}, size={self.size})'
+
+    def sync_header(self) -> None:
+        self.header['size'] = self.size
+        self.header['has_std'] = self.has_std
+
+    def reserve(self, capacity: int) -> None:
+        """Переносит данные в новый файл большей длины. Прежний файл
+        удаляется, а если его еще отображают другие объекты - при
+        следующем переносе или очистке архива."""
+        if capacity <= len(self.arrays['f']):
+            return
+        root, ext = os.path.splitext(self.path)
+        moved = ArchivedValues.create(f'{root}-{capacity}{ext}', capacity)
+        moved.extend(self)
+        path = self.path
+        self.path, self.header, self.arrays = (
+            moved.path, moved.header, moved.arrays)
+        del moved
+        stale_paths.add(path)
+        remove_stale_files()
+        if path in stale_paths:
+            print(f'Не удалось удалить файл архива {path}, '
+                  'удаление отложено.')
+
+    def append(self, row: dict) -> None:
+        super().append(row)
+        self.sync_header()
+
+    def extend(self, other: MeasuredValues) -> None:
+        super().extend(other)
+        self.sync_header()
+
+    def flush(self) -> None:
+        """Запись измененных страниц на диск."""
+        self.sync_header()
+        self.header.flush()
+        self.arrays['f'].flush()
+
+
+class SweepArchive:
+    """Каталог файлов измерений *.usa."""
+    def __init__(self, path: str = None) -> None:
+        self.path = path or os.path.join(basedir, 'archive')
+        self.counter = itertools.count()
+
+    def new_path(self) -> str:
+        os.makedirs(self.path, exist_ok=True)
+        name = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        return os.path.join(
+            self.path, f'{name}-{os.getpid()}-{next(self.counter)}.usa')
+
+    def create(self, capacity: int) -> ArchivedValues:
+        """Файл для нового измерения на capacity точек."""
+        return ArchivedValues.create(self.new_path(), capacity)
+
+    def store(self, values: MeasuredValues) -> ArchivedValues:
+        """Копия готового набора значений в новом файле архива."""
+        archived = self.create(len(values))
+        archived.extend(values)
+        archived.flush()
+        return archived
+
+    def cleanup(self, days: int) -> None:
+        """Удаляет файлы измерений старше days суток и прежние файлы,
+        данные которых перенесены в файл большей длины (reserve). Файлы,
+        открытые в других копиях программы, пропускаются."""
+        remove_stale_files()
+        if not os.path.isdir(self.path):
+            return
+        expired = time.time() - days * 86400
+        entries = [
+            entry for entry in os.scandir(self.path)
+            if entry.name.endswith('.usa')
+        ]
+        names = {entry.name for entry in entries}
+        for entry in entries:
+            root = entry.name[:-len('.usa')]
+            moved = any(
+                name.startswith(root + '-') and name != entry.name
+                and name[len(root) + 1:-len('.usa')].isdigit()
+                for name in names
+            )
+            if moved or (days and entry.stat().st_mtime < expired):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
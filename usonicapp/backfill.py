@@ -0,0 +1,106 @@
+"""Заполнение параметров calc_stat и эскизов в записях БД, сохраненных
+прежними версиями программы.
+
+Для каждой записи с данными, у которой не заполнены параметры STAT_KEYS
+или эскиз, данные декодируются один раз, после чего в запись
+сохраняются параметры и эскиз. Значения F, R и Q не изменяются.
+
+Пример запуска:
+    python backfill.py --sqlite db/usonicApp.db
+    python backfill.py --pg --batch 50
+"""
+import argparse
+import struct
+import time
+import zlib
+
+from calc_stat import STAT_KEYS, calc_stat
+from database import add_missing_columns, init_pg_db
+from datacodec import decode_values, encode_preview
+from models import STAT_FIELDS, Record
+from peewee import PostgresqlDatabase, SqliteDatabase
+
+
+def backfill_record(record: Record) -> dict:
+    """Новые значения полей записи или пустой словарь, если данные
+    записи не читаются."""
+    try:
+        data = decode_values(record.data)
+    except (ValueError, TypeError, KeyError, zlib.error,
+            struct.error) as error:
+        print(f'Запись {record.id} пропущена, данные не читаются: {error}')
+        return {}
+    fields = {Record.preview: encode_preview(data)}
+    stat = calc_stat(data)
+    if stat:
+        for key in STAT_KEYS:
+            fields[getattr(Record, STAT_FIELDS[key])] = stat[key]
+    return fields
+
+
+def backfill(db, batch: int = 100, force: bool = False) -> tuple:
+    """Обходит записи по возрастанию id пачками по batch записей.
+    Возвращает число просмотренных и обновленных записей."""
+    db.connect(reuse_if_open=True)
+    db.bind([Record])
+    add_missing_columns(db, [Record])
+    query = Record.select(Record.id, Record.data).where(
+        Record.data.is_null(False))
+    if not force:
+        query = query.where(
+            Record.f_zmin.is_null() | Record.preview.is_null())
+    last_id = 0
+    checked = updated = 0
+    while True:
+        records = list(query
+                       .where(Record.id > last_id)
+                       .order_by(Record.id)
+                       .limit(batch))
+        if not records:
+            break
+        with db.atomic():
+            for record in records:
+                fields = backfill_record(record)
+                if fields:
+                    Record.update(fields).where(
+                        Record.id == record.id).execute()
+                    updated += 1
+        checked += len(records)
+        last_id = records[-1].id
+        print(f'Просмотрено записей: {checked}, обновлено: {updated}')
+    db.close()
+    return checked, updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sqlite', help='Путь к локальной БД')
+    parser.add_argument(
+        '--pg', action='store_true', help='Сервер БД из настроек')
+    parser.add_argument(
+        '--batch', type=int, default=100, help='Записей в одной транзакции')
+    parser.add_argument(
+        '--force', action='store_true', help='Пересчитать все записи')
+    args = parser.parse_args()
+
+    databases = []
+    if args.sqlite:
+        databases.append(SqliteDatabase(args.sqlite))
+    if args.pg:
+        db = PostgresqlDatabase(None, autoconnect=False)
+        init_pg_db(db)
+        databases.append(db)
+    if not databases:
+        parser.error('Укажите --sqlite и/или --pg')
+
+    for db in databases:
+        start = time.perf_counter()
+        checked, updated = backfill(db, args.batch, args.force)
+        print(
+            f'{db.database}: обновлено {updated} из {checked} записей '
+            f'за {time.perf_counter() - start:.1f} c'
+        )
+
+
+if __name__ == '__main__':
+    main()
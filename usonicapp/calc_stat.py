@@ -1,6 +1,89 @@
-from decimal import Decimal
+"""Расчет параметров измерения по массивам float64 без поэлементных
+циклов.
+
+Расчет ведется только по участку [start, end): столбцы участка -
+представления массивов без копирования, а номера экстремумов находятся
+одним проходом по каждому нужному столбцу участка (SweepWindow).
+Результаты совпадают с исходным расчетом в Decimal (calc_stat_exact.py)
+в пределах погрешности float64.
+
+Частоты экстремумов в обоих расчетах - частоты точек измерения, поэтому
+их точность ограничена шагом. При расчете с fit (RESONANCE_FIT) частоты
+F_zmin, F_zmax, F_rmax и Q уточняются между точками (fit_resonance), что
+позволяет измерять с крупным шагом.
+
+Сравнение двух расчетов и точность fit проверяются тестами
+tests/test_calc_stat_parity.py.
+"""
 from math import pi, sqrt
 
+import calc_stat_exact
+import numpy as np
+
+# Параметры, которые сохраняются в записи без округления до целых
+STAT_KEYS = (
+    'F_zmin', 'Z_max', 'F_zmax', 'R_max', 'F_rmax', 'dF', 'R_n', 'L_n', 'C_n')
+# Емкость керамики, исключаемая из сопротивления в calc_RnXnZn
+C0 = 16.51 / 1000000000
+# Способы уточнения частот и Q между точками измерения
+FITS = ('parabola', 'circuit')
+# Число точек модели эквивалентной схемы в расчете circuit
+CIRCUIT_POINTS = 6001
+
+
+class SweepWindow:
+    """Участок [start, end) измерения для расчета параметров.
+
+    Столбцы f, z, r, x, i - представления массивов float64 без
+    копирования, номера точек отсчитываются от начала участка. Номера
+    экстремумов вычисляются один раз при первом обращении.
+    """
+    KEYS = ('f', 'z', 'r', 'x', 'i')
+
+    def __init__(self, data, start=None, end=None) -> None:
+        # Границы вложенного участка отсчитываются от начала внешнего
+        offset = data.start if isinstance(data, SweepWindow) else 0
+        start, end, _ = slice(start, end).indices(len(data.f))
+        end = max(start, end)
+        self.start: int = offset + start
+        for key in self.KEYS:
+            column = np.asarray(getattr(data, key), dtype=np.float64)
+            setattr(self, key, column[start:end])
+        self._extrema: dict = None
+
+    def __len__(self) -> int:
+        return len(self.f)
+
+    @property
+    def extrema(self) -> dict:
+        """Номера первых максимумов Z, R, I и минимума Z на участке."""
+        if self._extrema is None:
+            if not len(self):
+                raise ValueError('Пустой участок измерения')
+            self._extrema = {
+                'z_max': int(np.argmax(self.z)),
+                'z_min': int(np.argmin(self.z)),
+                'r_max': int(np.argmax(self.r)),
+                'i_max': int(np.argmax(self.i)),
+            }
+        return self._extrema
+
+
+def sweep_window(data, start=None, end=None) -> SweepWindow:
+    """Участок измерения. Участок без новых границ возвращается как есть,
+    вместе с найденными экстремумами."""
+    if isinstance(data, SweepWindow) and start is None and end is None:
+        return data
+    return SweepWindow(data, start, end)
+
+
+def frequency_window(data, low: float, high: float) -> tuple:
+    """Номера start, end точек с частотами от low до high включительно,
+    например для видимого диапазона графика. Частоты возрастают."""
+    freqs = np.asarray(data.f, dtype=np.float64)
+    return (int(np.searchsorted(freqs, low, side='left')),
+            int(np.searchsorted(freqs, high, side='right')))
+
 
 def calc_RnXnZn(data, start=None, end=None):
     """Расчет параметров R, X, Z для всей серии данных.
@@ -11,37 +94,24 @@ def calc_RnXnZn(data, start=None, end=None):
         умолчанию None.
 
     Returns:
-        dict: СЛоварь с RXZ параметрами для каждого значения частоты из
-        заданного диапазона.
+        dict: Словарь с массивами RXZ параметров для каждого значения
+        частоты из заданного диапазона.
     """
-    RXZ = {
-        'Rn': [],
-        'Xn': [],
-        'Zn': [],
+    window = sweep_window(data, start, end)
+    creal = C0
+    f, r, x = window.f, window.r, window.x
+
+    tmp = pi * 2 * f * creal
+    a = 1 + x * tmp
+    b = -r * tmp
+    tmp = a * a + b * b
+    Rn = (r * a + x * b) / tmp
+    Xn = (x * a - r * b) / tmp
+    return {
+        'Rn': Rn,
+        'Xn': Xn,
+        'Zn': np.sqrt(Rn * Rn + Xn * Xn),
     }
-    creal = Decimal('16.51') / 1000000000
-
-    if start is None:
-        start = 0
-    if end is None:
-        end = len(data.f)
-    for i in range(start, end):
-        X = data.x[i]
-        R = data.r[i]
-        F = data.f[i]
-
-        tmp = Decimal(pi) * 2 * F * creal
-        a = 1 + X * tmp
-        b = -R * tmp
-        tmp = a * a + b * b
-        Rn = (R * a + X * b) / tmp
-        Xn = (X * a - R * b) / tmp
-        Zn = sqrt(Rn * Rn + Xn * Xn)
-
-        RXZ['Rn'].append(Rn)
-        RXZ['Xn'].append(Xn)
-        RXZ['Zn'].append(Zn)
-    return RXZ
 
 
 def calc_ZmaxZminRmax(data, start=None, end=None):
@@ -56,38 +126,46 @@ def calc_ZmaxZminRmax(data, start=None, end=None):
     Returns:
         dict: Словарь с параметрами.
     """
-    if start is None:
-        start = 0
-    if end is None:
-        end = len(data.f)
-
+    window = sweep_window(data, start, end)
+    extrema = window.extrema
+    f = window.f
     stat = {
-        'Z_max': Decimal('0.0'),
-        'F_zmax': Decimal('0.0'),
-        'Z_min': Decimal('0.0'),
-        'F_zmin': Decimal('0.0'),
-        'R_max': Decimal('0.0'),
-        'F_rmax': Decimal('0.0'),
-        'dF': Decimal('0.0'),
+        'Z_max': float(window.z[extrema['z_max']]),
+        'F_zmax': float(f[extrema['z_max']]),
+        'Z_min': float(window.z[extrema['z_min']]),
+        'F_zmin': float(f[extrema['z_min']]),
+        'R_max': float(window.r[extrema['r_max']]),
+        'F_rmax': float(f[extrema['r_max']]),
     }
+    stat['dF'] = stat['F_rmax'] - stat['F_zmin']
+    return stat
 
-    stat['Z_max'] = max(data.z[start:end])
-    index = data.z.index(stat['Z_max'])
-    stat['F_zmax'] = data.f[index]
 
-    stat['Z_min'] = min(data.z[start:end])
-    index = data.z.index(stat['Z_min'])
-    stat['F_zmin'] = data.f[index]
+def half_power_q(f, i, index_I1: int, index_I2: int,
+                 Freq_I_max: float, I_max: float):
+    """Q_t по точкам index_I1 и index_I2 около уровня половинной мощности
+    слева и справа от максимума тока I_max на частоте Freq_I_max.
+    Частоты половинной мощности находятся линейной интерполяцией с
+    соседними точками."""
+    I_max_sqrt = I_max / sqrt(2)
 
-    stat['R_max'] = max(data.r[start:end])
-    index = data.r.index(stat['R_max'])
-    stat['F_rmax'] = data.f[index]
+    def point(index):
+        return float(f[index]), float(i[index])
 
-    stat['dF'] = stat['F_rmax'] - stat['F_zmin']
-    return stat
+    f1, i1 = point(index_I1)
+    f1_next, i1_next = point(index_I1 + 1)
+    k1 = (f1 - f1_next) / (i1 - i1_next)
+    f1_ = k1 * I_max_sqrt + f1_next - k1 * i1_next
+
+    f2, i2 = point(index_I2)
+    f2_prev, i2_prev = point(index_I2 - 1)
+    k2 = (f2 - f2_prev) / (i2 - i2_prev)
+    f2_ = k2 * I_max_sqrt + f2_prev - k2 * i2_prev
+
+    return Freq_I_max / (f2_ - f1_)
 
 
-def calc_q_t(data, start=None, end=None):
+def calc_q_t(data, start=None, end=None, peak=None):
     """Расчет Q_t.
 
     Args:
@@ -95,50 +173,26 @@ def calc_q_t(data, start=None, end=None):
         умолчанию None.
         end (integer, optional): Конечная частота для расчета. По
         умолчанию None.
+        peak (tuple, optional): Частота и значение максимума тока,
+        уточненные между точками. По умолчанию - точка с наибольшим
+        током.
 
     Returns:
-        Decimal: Значение Q_t.
+        float: Значение Q_t.
     """
-    I_max = max(data.i[start:end])
-    I_max_index = data.i.index(I_max)
-    Freq_I_max = data.f[I_max_index]
-    I_max_sqrt = I_max / Decimal(sqrt(2))
-
-    index_I1 = I_max_index
-    while data.i[index_I1] > I_max_sqrt:
-        if (index_I1 > 0):
-            index_I1 -= 1
-        else:
-            break
+    window = sweep_window(data, start, end)
+    f, i = window.f, window.i
+    I_max_index = window.extrema['i_max']
+    Freq_I_max, I_max = peak or (float(f[I_max_index]), float(i[I_max_index]))
+    I_max_sqrt = I_max / sqrt(2)
 
-    index_I2 = I_max_index
-    while data.i[index_I2] > I_max_sqrt:
-        if (index_I2 + 1 < len(data.f)):
-            index_I2 += 1
-        else:
-            break
-
-    k1 = Decimal(
-        (data.f[index_I1] - data.f[index_I1+1])
-        / (data.i[index_I1] - data.i[index_I1+1])
-    )
-    f1_ = (
-        k1*I_max_sqrt +
-        data.f[index_I1+1] -
-        k1*data.i[index_I1+1]
-    )
-    k2 = Decimal(
-        (data.f[index_I2] - data.f[index_I2-1])
-        / (data.i[index_I2] - data.i[index_I2-1])
-    )
-    f2_ = (
-        k2*I_max_sqrt +
-        data.f[index_I2-1] -
-        k2*data.i[index_I2-1]
-    )
-
-    Q_t = Freq_I_max/(f2_ - f1_)
-    return Q_t
+    # Ближайшие к максимуму слева и справа точки, в которых ток не
+    # больше I_max_sqrt, или края участка
+    below = np.flatnonzero(i[:I_max_index + 1] <= I_max_sqrt)
+    index_I1 = int(below[-1]) if len(below) else 0
+    below = np.flatnonzero(i[I_max_index:] <= I_max_sqrt)
+    index_I2 = I_max_index + int(below[0]) if len(below) else len(i) - 1
+    return half_power_q(f, i, index_I1, index_I2, Freq_I_max, I_max)
 
 
 def calc_QRnLnCn(creal, data, start=None, end=None):
@@ -154,46 +208,127 @@ def calc_QRnLnCn(creal, data, start=None, end=None):
     Returns:
         dict: Словарь с параметрами.
     """
-    if start is None:
-        start = 0
-    if end is None:
-        end = len(data.f)
-
-    stat = {'Q': Decimal('0.0'),
-            'R_n': Decimal('0.0'),
-            'L_n': Decimal('0.0'),
-            'C_n': Decimal('0.0'),
-            'C': Decimal('16.51'),
-            }
+    window = sweep_window(data, start, end)
+    stat = {'C': creal * 10 ** 3}
+    creal = creal / 10 ** 6
 
-    stat['C'] = Decimal(creal) * 10 ** 3
-    creal = Decimal(creal) / 10 ** 6
+    RXZ = calc_RnXnZn(window)
 
-    RXZ = calc_RnXnZn(data)
+    positive = np.flatnonzero(RXZ['Xn'] >= 0)
+    f1_pos = int(positive[0]) if len(positive) else 0
+    f2_pos = window.extrema['r_max']
 
-    f1_pos = 0
-    for i in range(start, end):
-        if RXZ['Xn'][i] >= 0:
-            f1_pos = i
-            break
-    R_max = max(data.r[start:end])
-    f2_pos = data.r.index(R_max)
+    Freq_1 = float(window.f[f1_pos])
+    Freq_2 = float(window.f[f2_pos])
+    W1 = pi * 2 * Freq_1
 
-    W1 = Decimal(pi) * 2 * data.f[f1_pos]
-
-    Freq_1 = data.f[f1_pos]
-    Freq_2 = data.f[f2_pos]
-
-    stat['R_n'] = RXZ['Rn'][f1_pos]
-    stat['C_n'] = creal * (Freq_2 ** 2-Freq_1 ** 2) / (Freq_1 ** 2)
+    stat['R_n'] = float(RXZ['Rn'][f1_pos])
+    stat['C_n'] = creal * (Freq_2 ** 2 - Freq_1 ** 2) / (Freq_1 ** 2)
     stat['L_n'] = 1 / (W1 * W1 * stat['C_n'])
-    stat['Q'] = calc_q_t(data, start, end)
+    stat['Q'] = calc_q_t(window)
     stat['L_n'] *= 10 ** 6
     stat['C_n'] *= 10 ** 9
     return stat
 
 
-def calc_stat(data, start=None, end=None):
+def parabola_vertex(f, y, index: int) -> tuple:
+    """Частота и значение в вершине параболы через точку index и две
+    соседние с ней. Для точки на краю участка и вырожденной параболы -
+    сама точка."""
+    f1, y1 = float(f[index]), float(y[index])
+    if not 0 < index < len(f) - 1:
+        return f1, y1
+    h0, h2 = float(f[index - 1]) - f1, float(f[index + 1]) - f1
+    if h0 == 0 or h2 == 0 or h0 == h2:
+        return f1, y1
+    # y = a * h^2 + b * h + y1, где h - отступ от частоты точки index
+    d0 = (float(y[index - 1]) - y1) / h0
+    d2 = (float(y[index + 1]) - y1) / h2
+    a = (d2 - d0) / (h2 - h0)
+    if a == 0:
+        return f1, y1
+    b = d0 - a * h0
+    h = min(max(-b / (2 * a), min(h0, h2)), max(h0, h2))
+    return f1 + h, y1 + (a * h + b) * h
+
+
+def fit_circuit(data, start=None, end=None) -> dict:
+    """F_zmin и Q_t по эквивалентной схеме преобразователя.
+
+    По точкам около резонанса, где ток не меньше половины максимального,
+    методом наименьших квадратов подбирается последовательная ветвь
+    R1 + j(a * f + b / f) после исключения емкости C0 (calc_RnXnZn).
+    F_zmin и Q_t находятся по модели с емкостью C0 на CIRCUIT_POINTS
+    частотах около резонанса. Если схема не подбирается, возвращается
+    None.
+    """
+    window = sweep_window(data, start, end)
+    i = window.i
+    I_max_index = window.extrema['i_max']
+    outside = np.flatnonzero(i < i[I_max_index] / 2)
+    low = outside[outside < I_max_index]
+    high = outside[outside > I_max_index]
+    low = min(int(low[-1]) + 1 if len(low) else 0, I_max_index - 1)
+    high = max(int(high[0]) if len(high) else len(i), I_max_index + 2)
+    if low < 0 or high > len(i):
+        return None
+    near = SweepWindow(window, low, high)
+    RXZ = calc_RnXnZn(near)
+    (a, b), *_ = np.linalg.lstsq(
+        np.column_stack((near.f, 1 / near.f)), RXZ['Xn'], rcond=None)
+    R1 = float(np.mean(RXZ['Rn']))
+    if a <= 0 or b >= 0 or R1 <= 0:
+        return None
+    Fs = sqrt(-b / a)
+    # Полоса последовательной ветви Fs / Q = R1 / a
+    f = np.linspace(Fs - 3 * R1 / a, Fs + 3 * R1 / a, CIRCUIT_POINTS)
+    z_motional = R1 + 1j * (a * f + b / f)
+    z_c0 = 1 / (1j * pi * 2 * f * C0)
+    z = np.abs(z_motional * z_c0 / (z_motional + z_c0))
+    model_i = 1 / z
+    I_max_index = int(np.argmax(model_i))
+    I_max_sqrt = model_i[I_max_index] / sqrt(2)
+    below = np.flatnonzero(model_i[:I_max_index] <= I_max_sqrt)
+    above = np.flatnonzero(model_i[I_max_index:] <= I_max_sqrt)
+    if not len(below) or not len(above):
+        return None
+    return {
+        'F_zmin': parabola_vertex(f, z, int(np.argmin(z)))[0],
+        'Q': half_power_q(
+            f, model_i, int(below[-1]), I_max_index + int(above[0]),
+            *parabola_vertex(f, model_i, I_max_index)),
+    }
+
+
+def fit_resonance(data, start=None, end=None, fit='parabola') -> dict:
+    """Уточнение F_zmin, F_zmax, F_rmax, dF и Q между точками измерения.
+
+    Args:
+        fit (str, optional): parabola - вершины парабол через экстремумы
+        Z, R, I и соседние с ними точки, Q_t по уровню половинной
+        мощности от вершины параболы тока; circuit - F_zmin и Q_t по
+        эквивалентной схеме (fit_circuit), остальное как в parabola.
+
+    Returns:
+        dict: Словарь с параметрами.
+    """
+    window = sweep_window(data, start, end)
+    extrema = window.extrema
+    f = window.f
+    stat = {
+        'F_zmin': parabola_vertex(f, window.z, extrema['z_min'])[0],
+        'F_zmax': parabola_vertex(f, window.z, extrema['z_max'])[0],
+        'F_rmax': parabola_vertex(f, window.r, extrema['r_max'])[0],
+        'Q': calc_q_t(
+            window, peak=parabola_vertex(f, window.i, extrema['i_max'])),
+    }
+    if fit == 'circuit':
+        stat.update(fit_circuit(window) or {})
+    stat['dF'] = stat['F_rmax'] - stat['F_zmin']
+    return stat
+
+
+def calc_stat(data, start=None, end=None, exact=False, fit=None):
     """Рассчитываем параметры.
 
     Args:
@@ -201,40 +336,139 @@ def calc_stat(data, start=None, end=None):
         умолчанию None.
         end (integer, optional): Конечная частота для расчета. По
          умолчанию None.
+        exact (bool, optional): Расчет в Decimal по calc_stat_exact.
+        fit (str, optional): Способ уточнения частот и Q между точками
+        из FITS (fit_resonance). По умолчанию частоты точек измерения.
 
     Returns:
-        list: Список параметров.
+        dict: Целые R, F, Q и параметры STAT_KEYS.
         """
-
-    def dec_to_str(num, n):
-        """Округление числа типа Decimal до n знаков после запятой и
-        преобразование результата в строку.
-        Args:
-            item (Decimal): Число с неизвестным количеством знаков после
-            запятой.
-            n (integer): Точность округления.
-
-        Returns:
-            String: Результат округления в виде строки.
-        """
-        if num == 0:
-            return '0'
-        return str(num.quantize(Decimal('1.' + n * '0')))
-
-    if start is None:
-        start = 0
-    if end is None:
-        end = len(data.f)
-
+    creal = 16.15
     try:
-        creal = 16.15
-        stat = calc_ZmaxZminRmax(data, start, end)
-        stat.update(calc_QRnLnCn(creal, data, start, end))
-
-        return {
+        if exact:
+            columns = calc_stat_exact.decimal_columns(data)
+            first, last, _ = slice(start, end).indices(len(columns.f))
+            stat = calc_stat_exact.calc_ZmaxZminRmax(columns, first, last)
+            stat.update(
+                calc_stat_exact.calc_QRnLnCn(creal, columns, first, last))
+        else:
+            window = SweepWindow(data, start, end)
+            # Деление на ноль в массивах прерывает расчет, как и в Decimal
+            with np.errstate(divide='raise', invalid='raise'):
+                stat = calc_ZmaxZminRmax(window)
+                stat.update(calc_QRnLnCn(creal, window))
+        if fit in FITS:
+            # Уточнение ведется в float64 и при расчете в Decimal
+            if exact:
+                window = SweepWindow(data, start, end)
+            with np.errstate(divide='raise', invalid='raise'):
+                stat.update(fit_resonance(window, fit=fit))
+
+        result = {
             'R': int(stat['Z_min']),
             'F': int(stat['F_zmin']),
             'Q': int(stat['Q']),
         }
+        result.update({key: float(stat[key]) for key in STAT_KEYS})
+        return result
     except (ArithmeticError, ValueError):
         return None
+
+
+class LiveStat:
+    """F, R и Q, которые уточняются по мере поступления точек измерения.
+
+    update() просматривает только новые точки: экстремумы Z, R и I
+    обновляются по экстремумам нового блока, точка половинной мощности
+    слева ищется между прежней точкой и новым максимумом тока, справа -
+    после максимума. Частоты измерения возрастают. Итоговые параметры
+    записи рассчитывает calc_stat.
+    """
+    def __init__(self) -> None:
+        self.data = None
+        self.size: int = 0
+        # Номер и значение первых максимумов Z, R, I и минимума Z
+        self.extrema: dict = {}
+        self.i_min: float = None
+        self.index_I1: int = None
+        self.index_I2: int = None
+
+    def update(self, data) -> None:
+        """Учет точек data, добавленных после предыдущего вызова."""
+        if data is not self.data:
+            self.__init__()
+            self.data = data
+        start, end = self.size, len(data)
+        if end <= start:
+            return
+        self.size = end
+        z, r, i = (
+            np.asarray(getattr(data, key)[start:end], dtype=np.float64)
+            for key in ('z', 'r', 'i'))
+        for key, column, greater in (
+                ('z_max', z, True), ('z_min', z, False),
+                ('r_max', r, True), ('i_max', i, True)):
+            index = int(np.argmax(column) if greater else np.argmin(column))
+            value = float(column[index])
+            current = self.extrema.get(key)
+            if current is None or (
+                    value > current[1] if greater else value < current[1]):
+                self.extrema[key] = (start + index, value)
+        block_min = float(i.min())
+        if self.i_min is None or block_min < self.i_min:
+            self.i_min = block_min
+
+        I_max_index, I_max = self.extrema['i_max']
+        I_max_sqrt = I_max / sqrt(2)
+        search_from = start
+        if I_max_index >= start:
+            # Новый максимум: прежняя точка слева остается ниже нового
+            # уровня, поэтому поиск продолжается от нее
+            if self.i_min <= I_max_sqrt:
+                low = self.index_I1 or 0
+                below = np.flatnonzero(np.asarray(
+                    data.i[low:I_max_index + 1], dtype=np.float64
+                ) <= I_max_sqrt)
+                self.index_I1 = low + int(below[-1]) if len(below) else None
+            self.index_I2 = None
+            search_from = I_max_index
+        if self.index_I2 is None:
+            below = np.flatnonzero(i[search_from - start:] <= I_max_sqrt)
+            if len(below):
+                self.index_I2 = search_from + int(below[0])
+
+    @property
+    def stat(self) -> dict:
+        """Текущие целые F, R и Q. Q равно None, пока не пройдены обе
+        точки половинной мощности."""
+        if not self.extrema:
+            return None
+        index, Z_min = self.extrema['z_min']
+        stat = {'F': int(float(self.data.f[index])), 'R': int(Z_min),
+                'Q': None}
+        if self.index_I1 is not None and self.index_I2 is not None:
+            f, i = (np.asarray(getattr(self.data, key), dtype=np.float64)
+                    for key in ('f', 'i'))
+            try:
+                with np.errstate(divide='raise', invalid='raise'):
+                    I_max_index, I_max = self.extrema['i_max']
+                    stat['Q'] = int(half_power_q(
+                        f, i, self.index_I1, self.index_I2,
+                        float(f[I_max_index]), I_max))
+            except (ArithmeticError, LookupError, ValueError):
+                pass
+        return stat
+
+    def captured(self, margin: float) -> bool:
+        """Резонанс пройден: ток поднялся выше и опустился ниже уровня
+        половинной мощности, максимум R лежит выше по частоте, чем
+        минимум Z, и после этих точек частота выросла больше чем на
+        margin."""
+        if self.index_I1 is None or self.index_I2 is None:
+            return False
+        r_max = self.extrema['r_max'][0]
+        if r_max <= self.extrema['z_min'][0]:
+            return False
+        f = self.data.f
+        last = max(self.index_I2, r_max)
+        return float(f[self.size - 1]) - float(f[last]) > margin
@@ -46,5 +46,25 @@ settings = Dynaconf(
         Validator('FPS', default=30, gte=1, lte=60),
         Validator('VOLTAGE', default=220, gte=25, lte=250),
         Validator('EXPRESS_STEP', default=10, gte=10, lte=100),
+        Validator('PIPELINE_WINDOW', default=1, gte=1, lte=32),
+        Validator('EXACT_CONVERSION', default=False),
+        Validator(
+            'RESONANCE_FIT', default='none',
+            is_in=('none', 'parabola', 'circuit')),
+        Validator('RAW_JOURNAL', default=False),
+        Validator('SAVE_RAW_DATA', default=False),
+        Validator('ADAPTIVE_SWEEP', default=False),
+        Validator('ADAPTIVE_COARSE_STEP', default=10, gte=1, lte=100),
+        Validator('ADAPTIVE_MARGIN', default=30, gte=1, lte=1000),
+        Validator('OVERSAMPLING', default=1, gte=1, lte=64),
+        Validator('OVERSAMPLING_SPREAD', default=2.0, gte=0.01, lte=100),
+        Validator('OVERSAMPLING_REMEASURE', default=2, gte=0, lte=10),
+        Validator('BINARY_RECORD_DATA', default=False),
+        Validator('SWEEP_ARCHIVE', default=False),
+        Validator('ARCHIVE_DAYS', default=7, gte=0, lte=3650),
+        Validator('EARLY_STOP', default=False),
+        Validator('EARLY_STOP_MARGIN', default=50, gte=1, lte=10000),
+        Validator('MULTI_STAND', default=False),
+        Validator('MAX_STANDS', default=4, gte=1, lte=16),
     ]
 )
@@ -14,11 +14,33 @@ COMMANDS = {
 }
 
 TIMER_CHECK_SERIAL_PORT = 1000
+# Проверка связи при отсутствии обмена с устройством и наибольшая пауза
+# между проверками после неудач, мс
+TIMER_IDLE_PROBE = 10000
+TIMER_PROBE_BACKOFF_MAXIMUM = 30000
 TIMER_RESPONSE = 300
 TIMER_DATA_RECEIVE = 500
 TIMER_SETTINGS_REQUEST = 500
 ATTEMPTS_MAXIMUM = 3
+# Границы адаптивного таймаута ожидания ответа, мс
+TIMER_RTO_MINIMUM = 20
+TIMER_RTO_MAXIMUM = 2000
+# Минимальное время ожидания ответа до завершения передачи данных, мс
+TIMER_RETRY_PATIENCE = TIMER_DATA_RECEIVE * ATTEMPTS_MAXIMUM
+# Время ожидания восстановления связи для продолжения прохода, мс
+TIMER_RESUME_PATIENCE = 60000
 TIMER_DB_CHECK = 5000
+# Наименьший интервал передачи показателей скорости сбора данных, мс
+TIMER_METRICS = 500
+# Точки передаются основному окну блоками: по заполнении блока или по
+# истечении TIMER_BLOCK мс после первой точки блока.
+BLOCK_POINTS = 256
+TIMER_BLOCK = 40
+# Число интервалов частоты в эскизе измерения Record.preview
+PREVIEW_BINS = 256
+# Полные данные сравниваемых записей загружаются, когда видимый диапазон
+# частот становится меньше этой доли диапазона эскизов.
+PREVIEW_ZOOM = 0.5
 
 PG_TABLE = 'pg_table'
 SQLITE_TABLE = 'sqlite_table'
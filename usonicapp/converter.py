@@ -0,0 +1,117 @@
+"""Быстрый пересчет кодов АЦП, полученных от COM-порта, в измеренные
+величины. Степени десяти считаются заранее в виде таблиц, блоки посылок
+обрабатываются векторно средствами NumPy в float64."""
+import time
+from decimal import Decimal
+
+import constants as cts
+import numpy as np
+
+CODE_MAX = 0xFFFF
+FRAME_FIELDS = ('v_ph_i', 'v_db_i', 'v_ph_u', 'v_db_u', 'v_ref', 'v_i')
+FRAME_LENGTH = 2 * len(FRAME_FIELDS)
+
+# Точность округления величин, как в SerialPortManager.calc_data
+QUANTIZE = {
+    'f': Decimal('.01'),
+    'z': Decimal('.01'),
+    'r': Decimal('.01'),
+    'x': Decimal('.01'),
+    'ph': Decimal('.01'),
+    'i': Decimal('.00000001'),
+    'u': Decimal('.01'),
+}
+# Число знаков после запятой для округления массивов
+DECIMALS = {
+    key: -value.as_tuple().exponent for key, value in QUANTIZE.items()
+}
+
+# Таблица 10 ** (k / 1200) для k из [-2 * CODE_MAX, 2 * CODE_MAX]. Покрывает
+# показатели z (2 * (v_db_u - v_db_i)) и u (2 * v_db_u - v_ref).
+POW_1200_OFFSET = 2 * CODE_MAX
+POW_1200 = np.power(
+    10.0, np.arange(-POW_1200_OFFSET, POW_1200_OFFSET + 1) / 1200)
+# Таблица 10 ** ((k - 2500) / 480) для k из [0, CODE_MAX].
+POW_480 = np.power(10.0, (np.arange(CODE_MAX + 1) - 2500) / 480)
+
+
+def parse_codes(payloads: bytes) -> np.ndarray:
+    """Преобразует подряд идущие 12-байтные посылки DATA в массив кодов
+    размером (n, 6) без копирования."""
+    return np.frombuffer(payloads, dtype='<u2').reshape(-1, len(FRAME_FIELDS))
+
+
+def convert_codes(codes, calibration, f) -> dict:
+    """Векторный пересчет блока кодов.
+
+    Args:
+        codes (array_like): Коды АЦП размером (n, 6).
+        calibration (Decimal | float): Калибровочный коэффициент.
+        f (array_like | float): Частота каждой точки или общая частота.
+
+    Returns:
+        dict: Массивы float64 с ключами f, z, r, x, ph, i, u без округления.
+    """
+    codes = np.asarray(codes, dtype=np.int64).reshape(-1, len(FRAME_FIELDS))
+    v_ph_i, v_db_i, v_ph_u, v_db_u, v_ref, v_i = codes.T
+    z = float(calibration) * POW_1200[2 * (v_db_u - v_db_i) + POW_1200_OFFSET]
+    ph = (v_ph_i - v_ph_u) / 10
+    radians = np.radians(ph)
+    return {
+        'f': np.broadcast_to(
+            np.asarray(f, dtype=np.float64), z.shape).copy(),
+        'z': z,
+        'r': z * np.cos(radians),
+        'x': z * np.sin(radians),
+        'ph': ph,
+        'i': cts.INDEX_I * POW_480[v_i],
+        'u': cts.INDEX_U * POW_1200[2 * v_db_u - v_ref + POW_1200_OFFSET],
+    }
+
+
+def round_values(values: dict) -> dict:
+    """Округление массивов до точности, принятой в calc_data."""
+    return {
+        key: np.round(value, DECIMALS[key])
+        for key, value in values.items()
+    }
+
+
+def main():
+    """Сравнение быстрого расчета с точным расчетом в Decimal и замер
+    времени на случайных кодах."""
+    from serialport import RawMeasuredValue, SerialPortManager
+
+    count = 100000
+    rng = np.random.default_rng(0)
+    codes = rng.integers(0, 4096, size=(count, len(FRAME_FIELDS)))
+    calibration = Decimal(1234) / 1000
+    freqs = 20000 + np.arange(count) / 100
+
+    start = time.perf_counter()
+    fast = round_values(convert_codes(codes, calibration, freqs))
+    fast_time = time.perf_counter() - start
+
+    sample = range(0, count, 100)
+    start = time.perf_counter()
+    exact = [
+        SerialPortManager.calc_data(
+            RawMeasuredValue(*(Decimal(int(code)) for code in codes[n])),
+            calibration,
+            freqs[n],
+        )
+        for n in sample
+    ]
+    exact_time = (time.perf_counter() - start) * count / len(sample)
+
+    print(f'NumPy: {fast_time:.3f} c, Decimal (оценка): {exact_time:.3f} c')
+    for key in QUANTIZE:
+        reference = np.array([float(getattr(value, key)) for value in exact])
+        deviation = np.abs(fast[key][list(sample)] - reference)
+        scale = np.maximum(np.abs(reference), 1)
+        print(f'{key}: макс. относительное отклонение '
+              f'{np.max(deviation / scale):.2e}')
+
+
+if __name__ == '__main__':
+    main()
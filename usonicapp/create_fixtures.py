@@ -1,6 +1,7 @@
 # from decimal import Decimal
 
 from config import settings
+from database import add_missing_columns
 from models import FactoryNumber, Record
 from peewee import PostgresqlDatabase, SqliteDatabase
 
@@ -28,6 +29,7 @@ if __name__ == '__main__':
         db.bind(models)
         db.connect()
         db.create_tables(models)
+        add_missing_columns(db, models)
         print('Создана ', db)
         """
         user_01 = cts.USERS[0]
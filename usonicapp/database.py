@@ -1,12 +1,12 @@
 import os
-from dataclasses import asdict
 from datetime import datetime
 
 import constants as cts
-import simplejson as json
 from config import settings
-from models import FactoryNumber, Record
-from peewee import OperationalError, PostgresqlDatabase, SqliteDatabase
+from datacodec import encode_preview, encode_record_data
+from models import STAT_FIELDS, FactoryNumber, Record
+from peewee import Case, OperationalError, PostgresqlDatabase, SqliteDatabase
+from playhouse.migrate import SchemaMigrator, migrate
 from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
 
 basedir = os.path.dirname(__file__)
@@ -23,6 +23,24 @@ def init_pg_db(db: PostgresqlDatabase) -> None:
     )
 
 
+def add_missing_columns(db, models) -> None:
+    """Добавляет в существующие таблицы поля моделей, появившиеся после
+    создания таблиц."""
+    migrator = SchemaMigrator.from_database(db)
+    for model in models:
+        table = model._meta.table_name
+        if not db.table_exists(table):
+            continue
+        columns = {column.name for column in db.get_columns(table)}
+        operations = [
+            migrator.add_column(table, field.column_name, field)
+            for field in model._meta.sorted_fields
+            if field.column_name not in columns
+        ]
+        if operations:
+            migrate(*operations)
+
+
 class DataBaseCheck(QObject):
     """Класс, отвечающий за проверку состояния подключения к БД."""
     pg_db_checked_signal: pyqtSignal = pyqtSignal(bool)
@@ -74,6 +92,8 @@ class DataBaseControl(QObject):
             autoconnect=False,
             pragmas={'foreign_keys': 1}
         )
+        # Пары (БД, модель), таблицы которых уже дополнены новыми полями
+        self.migrated: set = set()
 
     def connect_and_bind_models(self, db, models) -> bool:
         """Подключаемся к бд и привязываем модели."""
@@ -82,6 +102,11 @@ class DataBaseControl(QObject):
         try:
             db.connect()
             db.bind(models)
+            pending = [
+                model for model in models if (db, model) not in self.migrated]
+            if pending:
+                add_missing_columns(db, pending)
+                self.migrated.update((db, model) for model in pending)
             return True
         except OperationalError as error:
             print(error)
@@ -93,10 +118,9 @@ class DataBaseControl(QObject):
             return False
         # add validation
         if data is not None:
-            encode_data = json.dumps(asdict(data), use_decimal=True)
-            record.data = encode_data
+            record.data = encode_record_data(data)
+            record.preview = encode_preview(data)
         result = record.save()
-        # decode_data = json.loads(encode_data, use_decimal=True)
         if not result:
             return False
         self.close(db)
@@ -132,6 +156,35 @@ class DataBaseControl(QObject):
         self.close(db)
         return record
 
+    def get_previews(self, db, list_id: list) -> list:
+        """Возвращает записи с эскизами измерений без Record.data, кроме
+        записей, сохраненных без эскиза, и без сырых данных."""
+        if not self.connect_and_bind_models(db, [Record]):
+            return []
+        fields = [
+            field for field in Record._meta.sorted_fields
+            if field.name not in ('data', 'raw_data')
+        ]
+        data = Case(None, ((Record.preview.is_null(), Record.data),), None)
+        query = (Record
+                 .select(*fields, data.alias('data'))
+                 .where(Record.id.in_(list_id))
+                 .order_by(Record.date))
+        records = list(query)
+        self.close(db)
+        return records
+
+    def get_record_data(self, db, id: int):  # noqa  -> bytes | None
+        """Возвращает Record.data записи с заданным id."""
+        if not self.connect_and_bind_models(db, [Record]):
+            return None
+        record = (Record
+                  .select(Record.data)
+                  .where(Record.id == id)
+                  .get_or_none())
+        self.close(db)
+        return None if record is None else record.data
+
     def generate_factory_number(self, db=None) -> str:
         """Генерация нового заводского номера."""
         if not self.connect_and_bind_models(db, [FactoryNumber]):
@@ -299,10 +352,14 @@ class DataBaseControl(QObject):
                         date=record.date,
                         temporary=record.temporary,
                         data=record.data,
-                        frequency=record.frequency,
-                        resistance=record.resistance,
-                        quality_factor=record.quality_factor,
                         composition=record.composition,
+                        raw_data=record.raw_data,
+                        metrics=record.metrics,
+                        preview=record.preview,
+                        **{
+                            name: getattr(record, name)
+                            for name in STAT_FIELDS.values()
+                        },
                     )
             transfer_db.close()
             return True
@@ -0,0 +1,253 @@
+"""Двоичный формат данных измерения, сохраняемых в Record.data.
+
+Запись состоит из заголовка HEADER, оглавления столбцов и самих столбцов
+f, z, r, x, ph, i, u (и z_std, если он есть). Значения каждого столбца
+хранятся целыми числами с точностью converter.QUANTIZE в виде разностей
+соседних значений и наименьшего подходящего целого типа, а при
+необходимости сжимаются zlib. Столбцы сжимаются по отдельности, поэтому
+StoredValues читает только те из них, к которым обращаются. Записи в
+прежнем формате JSON распознаются по первому символу и читаются как
+раньше.
+
+Для просмотра без загрузки данных вместе с записью сохраняется эскиз
+Record.preview: минимум и максимум Z, R, I и Ph в PREVIEW_BINS
+интервалах частоты.
+"""
+import struct
+import zlib
+
+import constants as cts
+import numpy as np
+import simplejson as json
+from config import settings
+from converter import DECIMALS
+from serialport import MeasuredValues
+
+MAGIC = b'USD'
+VERSION = 2
+FLAG_COMPRESSED = 1
+FLAG_STD = 2
+# Сигнатура, версия, флаги, число точек
+HEADER = struct.Struct('<3sBBI')
+# Код целого типа и длина данных столбца в байтах
+COLUMN = struct.Struct('<cI')
+INTEGER_TYPES = (np.int8, np.int16, np.int32, np.int64)
+
+PREVIEW_MAGIC = b'USP'
+PREVIEW_VERSION = 1
+# Сигнатура, версия, число непустых интервалов
+PREVIEW_HEADER = struct.Struct('<3sBH')
+PREVIEW_COLUMNS = ('z', 'r', 'i', 'ph')
+
+
+def column_scale(key: str) -> int:
+    return 10 ** DECIMALS['z' if key == 'z_std' else key]
+
+
+def column_keys(flags: int) -> tuple:
+    return MeasuredValues.COLUMNS + (('z_std',) if flags & FLAG_STD else ())
+
+
+def encode_column(key: str, values: np.ndarray, compress: bool) -> tuple:
+    """Код типа и данные столбца: разности целых значений в наименьшем
+    подходящем типе."""
+    integers = np.rint(values * column_scale(key)).astype(np.int64)
+    deltas = np.diff(integers, prepend=np.int64(0))
+    for dtype in INTEGER_TYPES:
+        info = np.iinfo(dtype)
+        if not len(deltas) or (
+                info.min <= deltas.min() and deltas.max() <= info.max):
+            break
+    data = deltas.astype(np.dtype(dtype).newbyteorder('<')).tobytes()
+    if compress:
+        data = zlib.compress(data, 6)
+    return np.dtype(dtype).char.encode(), data
+
+
+def encode_values(values: MeasuredValues, compress: bool = True) -> bytes:
+    """Двоичное представление данных измерения."""
+    flags = FLAG_STD if values.has_std else 0
+    if compress:
+        flags |= FLAG_COMPRESSED
+    columns = [
+        encode_column(key, getattr(values, key), compress)
+        for key in column_keys(flags)
+    ]
+    return b''.join([
+        HEADER.pack(MAGIC, VERSION, flags, len(values)),
+        *(COLUMN.pack(code, len(data)) for code, data in columns),
+        *(data for _, data in columns),
+    ])
+
+
+def encode_record_data(values: MeasuredValues) -> bytes:
+    """Данные для Record.data. Двоичный формат включается настройкой
+    BINARY_RECORD_DATA после обновления всех программ, читающих общую
+    БД: прежние версии читают только JSON."""
+    if settings.BINARY_RECORD_DATA:
+        return encode_values(values)
+    return json.dumps(values.to_dict(), use_decimal=True).encode('utf-8')
+
+
+class StoredValues:
+    """Данные измерения из Record.data, столбцы которых декодируются при
+    первом обращении и запоминаются.
+
+    Хранимый буфер не копируется: столбцы читаются из срезов memoryview.
+    Запись в формате JSON разбирается целиком при создании объекта.
+    """
+    def __init__(self, blob) -> None:
+        self.buffer = memoryview(blob)
+        self.decoded: dict = {}
+        # Код типа, начало, длина и признак сжатия данных каждого столбца
+        self.directory: dict = {}
+        if self.buffer[:len(MAGIC)] != MAGIC:
+            data = json.loads(self.buffer.tobytes(), use_decimal=True)
+            values = MeasuredValues(**data)
+            self.size = len(values)
+            self.keys = column_keys(FLAG_STD if values.has_std else 0)
+            self.decoded = {key: getattr(values, key) for key in self.keys}
+            return
+        _, version, flags, self.size = HEADER.unpack_from(self.buffer)
+        self.keys = column_keys(flags)
+        if version != VERSION:
+            raise ValueError(f'Неизвестная версия формата данных: {version}')
+        self.read_directory(flags)
+
+    def read_directory(self, flags: int) -> None:
+        """Оглавление столбцов, записанное после заголовка."""
+        offset = HEADER.size + COLUMN.size * len(self.keys)
+        for number, key in enumerate(self.keys):
+            code, length = COLUMN.unpack_from(
+                self.buffer, HEADER.size + COLUMN.size * number)
+            self.directory[key] = (
+                code, offset, length, bool(flags & FLAG_COMPRESSED))
+            offset += length
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getattr__(self, key: str) -> np.ndarray:
+        if key not in MeasuredValues.COLUMNS + ('z_std',):
+            raise AttributeError(key)
+        return self.column(key)
+
+    def column(self, key: str) -> np.ndarray:
+        """Столбец key. Отсутствующий столбец z_std - пустой массив."""
+        if key in self.decoded:
+            return self.decoded[key]
+        if key not in self.directory:
+            return np.empty(0)
+        code, offset, length, compressed = self.directory[key]
+        data = self.buffer[offset:offset + length]
+        if compressed:
+            data = zlib.decompress(data)
+        deltas = np.frombuffer(
+            data, dtype=np.dtype(code.decode()).newbyteorder('<'),
+            count=self.size)
+        values = np.cumsum(deltas, dtype=np.int64) / column_scale(key)
+        self.decoded[key] = values
+        return values
+
+    def curve(self, key: str) -> tuple:
+        """Точки (частоты, значения) графика столбца key."""
+        return self.f, self.column(key)
+
+    def values(self) -> MeasuredValues:
+        """Все столбцы в виде MeasuredValues."""
+        return MeasuredValues(**{key: self.column(key) for key in self.keys})
+
+
+def decode_values(blob) -> MeasuredValues:
+    """Данные измерения из Record.data в двоичном формате или JSON."""
+    return StoredValues(blob).values()
+
+
+def encode_preview(values, bins: int = cts.PREVIEW_BINS) -> bytes:
+    """Эскиз измерения: первая и последняя частота, минимум и максимум
+    столбцов PREVIEW_COLUMNS в каждом непустом интервале частоты.
+    Значения хранятся в float32, таблица сжимается zlib."""
+    freqs = np.asarray(values.f, dtype=np.float64)
+    if not len(freqs):
+        return None
+    order = np.argsort(freqs, kind='stable')
+    freqs = freqs[order]
+    edges = np.linspace(freqs[0], freqs[-1], bins + 1)[1:-1]
+    starts = np.union1d(0, np.searchsorted(freqs, edges))
+    starts = starts[starts < len(freqs)]
+    ends = np.append(starts[1:], len(freqs)) - 1
+    table = [freqs[starts], freqs[ends]]
+    for key in PREVIEW_COLUMNS:
+        column = np.asarray(getattr(values, key), dtype=np.float64)[order]
+        table.append(np.minimum.reduceat(column, starts))
+        table.append(np.maximum.reduceat(column, starts))
+    table = np.column_stack(table).astype('<f4')
+    return (PREVIEW_HEADER.pack(PREVIEW_MAGIC, PREVIEW_VERSION, len(starts))
+            + zlib.compress(table.tobytes(), 6))
+
+
+class SweepPreview:
+    """Эскиз измерения из Record.preview."""
+    def __init__(self, blob) -> None:
+        blob = memoryview(blob)
+        magic, version, bins = PREVIEW_HEADER.unpack_from(blob)
+        if magic != PREVIEW_MAGIC or version != PREVIEW_VERSION:
+            raise ValueError('Неизвестный формат эскиза измерения')
+        table = np.frombuffer(
+            zlib.decompress(blob[PREVIEW_HEADER.size:]), dtype='<f4'
+        ).reshape(bins, 2 + 2 * len(PREVIEW_COLUMNS))
+        self.table: np.ndarray = table.astype(np.float64)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    @property
+    def first(self) -> float:
+        return self.table[0, 0]
+
+    @property
+    def last(self) -> float:
+        return self.table[-1, 1]
+
+    def curve(self, key: str) -> tuple:
+        """Точки (частоты, значения) ломаной, которая в каждом интервале
+        проходит от минимума к максимуму столбца key. В масштабе всего
+        измерения она совпадает с графиком полных данных."""
+        column = 2 + 2 * PREVIEW_COLUMNS.index(key)
+        freqs = self.table[:, :2].ravel()
+        return freqs, self.table[:, column:column + 2].ravel()
+
+
+def main():
+    """Сравнение размера и времени чтения двоичного формата и JSON."""
+    import time
+
+    from converter import convert_codes, parse_codes, round_values
+    from simulator import SimulatedDevice
+
+    device = SimulatedDevice(seed=0)
+    freqs = 21000 + np.arange(3000, dtype=np.float64)
+    payloads = b''.join(device.encode_codes(f) for f in freqs.tolist())
+    values = MeasuredValues.from_arrays(
+        round_values(convert_codes(parse_codes(payloads), 1, freqs)))
+
+    text = json.dumps(values.to_dict(), use_decimal=True).encode('utf-8')
+    blob = encode_values(values)
+    for name, data in (('JSON', text), ('Двоичный', blob)):
+        start = time.perf_counter()
+        for _ in range(10):
+            decoded = decode_values(data)
+        elapsed = (time.perf_counter() - start) / 10
+        print(f'{name}: {len(data)} байт, чтение {elapsed * 1000:.2f} мс')
+    assert decoded.to_dict() == values.to_dict()
+
+    start = time.perf_counter()
+    for _ in range(10):
+        stored = StoredValues(blob)
+        stored.f, stored.ph
+    elapsed = (time.perf_counter() - start) / 10
+    print(f'Столбцы f и ph: чтение {elapsed * 1000:.2f} мс')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,10 @@
-from dataclasses import asdict
 from decimal import Decimal
 from json import loads
 
 import psycopg2
-import simplejson as json
 from calc_stat import calc_stat
 from config import settings
+from datacodec import encode_preview, encode_record_data
 from models import Record
 from peewee import (DataError, IntegrityError, OperationalError,
                     PostgresqlDatabase)
@@ -182,8 +181,10 @@ def load_records() -> list:
         if comment is None:
             comment = ''
 
+        preview = None
         if data is not None:
-            data = json.dumps(asdict(data), use_decimal=True)
+            preview = encode_preview(data)
+            data = encode_record_data(data)
         try:
             record, created = Record.get_or_create(
                 user=item[1],
@@ -193,6 +194,7 @@ def load_records() -> list:
                 comment=comment,
                 date=item[0],
                 data=data,
+                preview=preview,
                 frequency=stats.get('F'),
                 resistance=stats.get('R'),
                 quality_factor=stats.get('Q'),
@@ -200,6 +202,8 @@ def load_records() -> list:
             )
 
             if created:
+                record.set_stat(stats)
+                record.save()
                 print('Запись загружена', record)
             else:
                 print('Запись существует')
@@ -0,0 +1,134 @@
+"""План частот измерения.
+
+Частоты хранятся точно, в целых сотых долях Гц, в виде отрезков с
+постоянным шагом. Точки вычисляются по номеру, поэтому план на миллионы
+частот занимает несколько строк памяти, а переход к следующей точке,
+число оставшихся точек и доля выполнения считаются за O(1).
+"""
+from __future__ import annotations
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from decimal import Decimal
+
+
+def to_centihertz(value) -> int:
+    """Частота в Гц (int, float, Decimal) в целых сотых долях Гц."""
+    return int((Decimal(str(value)) * 100).to_integral_value())
+
+
+@dataclass(frozen=True)
+class Segment:
+    """Отрезок плана: count частот от start с шагом step (сотые доли Гц)."""
+    start: int
+    step: int
+    count: int
+
+    @property
+    def last(self) -> int:
+        return self.start + self.step * (self.count - 1)
+
+
+class FrequencyPlan:
+    """Последовательность частот из одного или нескольких отрезков.
+
+    Позиция следующей точки хранится в плане: next() выдает частоты по
+    порядку, remaining и progress описывают оставшуюся часть прохода.
+    """
+    def __init__(self, segments=()) -> None:
+        self.segments: list = [item for item in segments if item.count > 0]
+        # Номер первой точки каждого отрезка
+        self.offsets: list = []
+        length = 0
+        for segment in self.segments:
+            self.offsets.append(length)
+            length += segment.count
+        self.length: int = length
+        self.position: int = 0
+
+    @classmethod
+    def uniform(cls, start, stop, step) -> FrequencyPlan:
+        """Частоты от start до stop (не включая) с шагом step, как
+        numpy.arange."""
+        start, stop, step = map(to_centihertz, (start, stop, step))
+        count = max(0, -(-(stop - start) // step))
+        return cls([Segment(start, step, count)])
+
+    @classmethod
+    def from_windows(cls, windows: list, step) -> FrequencyPlan:
+        """Частоты внутри окон (начало, конец) включительно с шагом step."""
+        step = to_centihertz(step)
+        segments = []
+        for start, stop in windows:
+            start, stop = to_centihertz(start), to_centihertz(stop)
+            segments.append(Segment(start, step, (stop - start) // step + 1))
+        return cls(segments)
+
+    @classmethod
+    def from_points(cls, points) -> FrequencyPlan:
+        """План по произвольному списку частот в Гц. Участки с
+        одинаковым положительным шагом объединяются в отрезки."""
+        points = [to_centihertz(point) for point in points]
+        segments = []
+        index = 0
+        while index < len(points):
+            end = index + 1
+            step = points[end] - points[index] if end < len(points) else 1
+            if step > 0:
+                while (end < len(points)
+                       and points[end] - points[end - 1] == step):
+                    end += 1
+            else:
+                step = 1
+            segments.append(Segment(points[index], step, end - index))
+            index = end
+        return cls(segments)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> int:
+        """Частота точки с номером index, сотые доли Гц."""
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('Номер точки вне плана частот')
+        number = bisect_right(self.offsets, index) - 1
+        segment = self.segments[number]
+        return segment.start + segment.step * (index - self.offsets[number])
+
+    def __iter__(self):
+        for segment in self.segments:
+            yield from range(
+                segment.start, segment.last + 1, segment.step)
+
+    @property
+    def first(self) -> float:
+        """Первая частота, Гц."""
+        return self[0] / 100
+
+    @property
+    def last(self) -> float:
+        """Последняя частота, Гц."""
+        return self[-1] / 100
+
+    @property
+    def remaining(self) -> int:
+        return self.length - self.position
+
+    @property
+    def progress(self) -> float:
+        """Доля выданных точек от 0 до 1."""
+        return self.position / self.length if self.length else 1.0
+
+    def next(self) -> int:
+        """Следующая частота в сотых долях Гц или None в конце плана."""
+        if self.position >= self.length:
+            return None
+        freq = self[self.position]
+        self.position += 1
+        return freq
+
+    def rewind(self) -> None:
+        """Возврат к началу плана."""
+        self.position = 0
@@ -0,0 +1,214 @@
+"""Журнал сырых посылок DATA, полученных от COM-порта.
+
+Файл журнала состоит из заголовка и записей фиксированной длины
+RECORD_DTYPE, поэтому дописывается без перестроения и читается целиком
+одним вызовом numpy. Каждое измерение начинается с записи SWEEP, в
+которой хранятся время начала, калибровка и напряжение, за ней следуют
+записи POINT с частотой, смещением по времени и 12 байтами данных.
+
+Смещение записывается в мс по монотонным часам (флаг FLAG_OFFSET_MS) и
+ограничивается OFFSET_MAX. Журналы прежних версий хранят смещение в мкс
+без флага и читаются как раньше.
+"""
+import os
+import struct
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+
+import numpy as np
+from converter import FRAME_FIELDS, FRAME_LENGTH
+
+basedir = os.path.dirname(__file__)
+
+MAGIC = b'USONICJ1'
+KIND_SWEEP = 1
+KIND_POINT = 2
+# Смещение записи POINT в мс, без флага - в мкс
+FLAG_OFFSET_MS = 1
+OFFSET_MAX = 0xFFFFFFFF
+
+RECORD_DTYPE = np.dtype([
+    ('kind', 'u1'),
+    ('flags', 'u1'),
+    ('calibration', '<u2'),
+    ('freq', '<i4'),
+    ('offset', '<u4'),
+    ('payload', f'V{FRAME_LENGTH}'),
+])
+HEADER = MAGIC.ljust(RECORD_DTYPE.itemsize, b'\x00')
+RECORD = struct.Struct(f'<BBHiI{FRAME_LENGTH}s')
+SWEEP_PAYLOAD = struct.Struct(f'<dH{FRAME_LENGTH - 10}x')
+
+
+@dataclass
+class RawSweep:
+    """Сырые данные одного измерения."""
+    timestamp: float
+    calibration: Decimal
+    voltage: int
+    freqs: np.ndarray
+    # Смещения точек от начала измерения в мкс
+    offsets: np.ndarray
+    codes: np.ndarray
+
+    @property
+    def date(self) -> datetime:
+        return datetime.fromtimestamp(self.timestamp)
+
+
+def encode_sweep_header(calibration_code: int, voltage: int, timestamp: float) -> bytes:  # noqa
+    """Запись SWEEP, открывающая новое измерение."""
+    return RECORD.pack(
+        KIND_SWEEP, 0, calibration_code, 0, 0,
+        SWEEP_PAYLOAD.pack(timestamp, voltage),
+    )
+
+
+def encode_point(freq: int, offset: int, payload: bytes) -> bytes:
+    """Запись POINT с частотой в сотых долях Гц и смещением в мс."""
+    return RECORD.pack(
+        KIND_POINT, FLAG_OFFSET_MS, 0, freq,
+        min(max(offset, 0), OFFSET_MAX), payload)
+
+
+class RawFrameJournal:
+    """Запись сырых посылок текущего измерения в файл журнала и в буфер,
+    который при необходимости сохраняется вместе с Record.
+
+    Файл ведется, только если журнал открыт (open), буфер - только если
+    он включен при запуске (start). Без того и другого посылки не
+    сохраняются."""
+    def __init__(self, path=None, suffix=None) -> None:
+        self.path = path
+        self.suffix = suffix
+        self.file = None
+        # Путь открытого файла: по нему определяется смена суток
+        self.file_path: str = None
+        self.keep_sweep: bool = False
+        self.sweep: bytearray = bytearray()
+        self.started_at: float = 0.0
+        # Начало измерения по монотонным часам для смещений точек
+        self.started_clock: float = 0.0
+
+    @staticmethod
+    def default_path(suffix=None) -> str:
+        """Файл журнала за текущие сутки. Для каждого стенда, кроме
+        основного, ведется отдельный файл с именем порта в суффиксе."""
+        name = datetime.now().strftime('%Y-%m-%d')
+        if suffix:
+            name += f'-{os.path.basename(suffix)}'
+        return os.path.join(basedir, 'journal', name + '.usj')
+
+    @property
+    def active(self) -> bool:
+        """Посылки сохраняются в файл или в буфер измерения."""
+        return self.file is not None or self.keep_sweep
+
+    def start(self, write: bool, keep: bool) -> None:
+        """Включает запись в файл (write) и в буфер измерения (keep)
+        перед началом передачи данных."""
+        self.keep_sweep = keep
+        self.sweep = bytearray()
+        if write:
+            self.open()
+        else:
+            self.close()
+
+    def open(self) -> None:
+        """Открывает файл журнала на дозапись. Если с открытия файла
+        сменились сутки, открывается файл за новые сутки."""
+        path = self.path or self.default_path(self.suffix)
+        if self.file is not None:
+            if path == self.file_path:
+                return
+            self.close()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, 'ab')
+        self.file_path = path
+        if self.file.tell() == 0:
+            self.file.write(HEADER)
+
+    def start_sweep(self, calibration_code: int, voltage: int) -> None:
+        """Начало нового измерения."""
+        if not self.active:
+            return
+        if self.file is not None:
+            self.open()
+        self.started_at = time.time()
+        self.started_clock = time.monotonic()
+        header = encode_sweep_header(
+            calibration_code, voltage, self.started_at)
+        if self.keep_sweep:
+            self.sweep = bytearray(header)
+        if self.file is not None:
+            self.file.write(header)
+
+    def add_point(self, freq: int, payload: bytes) -> None:
+        """Добавляет посылку DATA для частоты freq (в сотых долях Гц)."""
+        if not self.active:
+            return
+        offset = int((time.monotonic() - self.started_clock) * 1000)
+        record = encode_point(freq, offset, payload)
+        if self.keep_sweep:
+            self.sweep += record
+        if self.file is not None:
+            self.file.write(record)
+
+    def finish_sweep(self) -> bytes:
+        """Завершение измерения. Возвращает сырые данные измерения, при
+        повторном вызове - пустую строку."""
+        if self.file is not None:
+            self.file.flush()
+        data = bytes(self.sweep)
+        self.sweep = bytearray()
+        return data
+
+    def close(self) -> None:
+        """Закрывает файл журнала."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.file_path = None
+
+
+def split_sweeps(records: np.ndarray) -> list:
+    """Разбивает массив записей журнала на измерения."""
+    sweeps = []
+    starts = np.flatnonzero(records['kind'] == KIND_SWEEP)
+    bounds = np.append(starts, len(records))
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        header = records[start]
+        points = records[start + 1:end]
+        points = points[points['kind'] == KIND_POINT]
+        timestamp, voltage = SWEEP_PAYLOAD.unpack(header['payload'].tobytes())
+        offsets = points['offset'].astype(np.int64)
+        offsets[points['flags'] & FLAG_OFFSET_MS != 0] *= 1000
+        codes = np.frombuffer(
+            points['payload'].tobytes(), dtype='<u2'
+        ).reshape(-1, len(FRAME_FIELDS))
+        sweeps.append(RawSweep(
+            timestamp=timestamp,
+            calibration=Decimal(int(header['calibration'])) / 1000,
+            voltage=voltage,
+            freqs=points['freq'],
+            offsets=offsets,
+            codes=codes,
+        ))
+    return sweeps
+
+
+def decode_sweeps(data: bytes) -> list:
+    """Разбор сырых данных измерения, сохраненных вместе с Record."""
+    size = len(data) - len(data) % RECORD_DTYPE.itemsize
+    return split_sweeps(np.frombuffer(data[:size], dtype=RECORD_DTYPE))
+
+
+def read_journal(path: str) -> list:
+    """Чтение всех измерений из файла журнала. Недописанная последняя
+    запись отбрасывается."""
+    records = np.memmap(path, dtype=np.uint8, mode='r')
+    if bytes(records[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f'{path}: неизвестный формат журнала')
+    return decode_sweeps(records[len(HEADER):])
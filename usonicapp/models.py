@@ -1,9 +1,25 @@
 from datetime import datetime
 
 from peewee import (BlobField, BooleanField, CharField, DateTimeField,
-                    IntegerField, Model, TextField)
+                    DoubleField, IntegerField, Model, TextField)
 from playhouse.shortcuts import ThreadSafeDatabaseMetadata
 
+# Поля записи, в которых сохраняются параметры calc_stat
+STAT_FIELDS = {
+    'F': 'frequency',
+    'R': 'resistance',
+    'Q': 'quality_factor',
+    'F_zmin': 'f_zmin',
+    'Z_max': 'z_max',
+    'F_zmax': 'f_zmax',
+    'R_max': 'r_max',
+    'F_rmax': 'f_rmax',
+    'dF': 'delta_f',
+    'R_n': 'r_n',
+    'L_n': 'l_n',
+    'C_n': 'c_n',
+}
+
 
 class BaseModel(Model):
     class Meta:
@@ -91,6 +107,75 @@ class Record(BaseModel):
         max_length=40,
         null=True,
     )
+    raw_data = BlobField(
+        verbose_name='Сырые данные',
+        help_text='Коды АЦП измерения в формате журнала journal.py',
+        null=True,
+    )
+    metrics = TextField(
+        verbose_name='Показатели сбора данных',
+        help_text='Скорость, время ответа, повторы и таймауты по проходам',
+        null=True,
+    )
+    preview = BlobField(
+        verbose_name='Эскиз измерения',
+        help_text='Огибающая Z, R, I и Ph в формате datacodec',
+        null=True,
+    )
+    f_zmin = DoubleField(
+        verbose_name='Частота резонанса',
+        help_text='F_zmin, Гц, с уточнением между точками измерения',
+        null=True,
+        index=True,
+    )
+    z_max = DoubleField(
+        verbose_name='Максимальный импеданс',
+        help_text='Z_max, Ом',
+        null=True,
+        index=True,
+    )
+    f_zmax = DoubleField(
+        verbose_name='Частота максимального импеданса',
+        help_text='F_zmax, Гц',
+        null=True,
+        index=True,
+    )
+    r_max = DoubleField(
+        verbose_name='Максимальное активное сопротивление',
+        help_text='R_max, Ом',
+        null=True,
+        index=True,
+    )
+    f_rmax = DoubleField(
+        verbose_name='Частота максимального активного сопротивления',
+        help_text='F_rmax, Гц',
+        null=True,
+        index=True,
+    )
+    delta_f = DoubleField(
+        verbose_name='Разность частот резонанса и антирезонанса',
+        help_text='dF = F_rmax - F_zmin, Гц',
+        null=True,
+        index=True,
+    )
+    r_n = DoubleField(
+        verbose_name='Сопротивление эквивалентной схемы',
+        help_text='R_n, Ом',
+        null=True,
+        index=True,
+    )
+    l_n = DoubleField(
+        verbose_name='Индуктивность эквивалентной схемы',
+        help_text='L_n, мкГн',
+        null=True,
+        index=True,
+    )
+    c_n = DoubleField(
+        verbose_name='Емкость эквивалентной схемы',
+        help_text='C_n, нФ',
+        null=True,
+        index=True,
+    )
 
     class Meta:
         ordering = ['-date']
@@ -98,6 +183,11 @@ class Record(BaseModel):
     def __str__(self):
         return f'{self.date} - {self.factory_number}'
 
+    def set_stat(self, stat: dict) -> None:
+        """Заполняет поля параметров по результату calc_stat."""
+        for key, name in STAT_FIELDS.items():
+            setattr(self, name, stat.get(key))
+
     def to_dict(self):
         return {
             'user': self.user,
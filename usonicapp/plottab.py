@@ -1,6 +1,7 @@
 import constants as cts
 import matplotlib.pyplot as plt
-import simplejson as json
+from calc_stat import LiveStat
+from datacodec import StoredValues, SweepPreview
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as Toolbar
 from matplotlib.figure import Figure
@@ -84,11 +85,14 @@ class CompareMplCanvas(FigureCanvasQTAgg):
 
 class ComparePlotTab(QObject):
     """Класс описывающий вкладку QTabwidget и графики."""
-    def __init__(self, tabwidget: QTabWidget, records, mode) -> None:  # noqa
+    def __init__(self, tabwidget: QTabWidget, records, mode, load_data=None) -> None:  # noqa
         super().__init__()
         self.tabwidget: QTabWidget = tabwidget
         self.records = records
         self.mode = mode
+        # Загрузка Record.data для записей, выгруженных только с эскизом
+        self.load_data = load_data
+        self.previews: list = []
         self.init_widgets()
         self.init_plots()
 
@@ -218,35 +222,38 @@ class ComparePlotTab(QObject):
         page_layout.setContentsMargins(0, 0, 0, 0)
 
     def init_plots(self) -> None:
-        """Настройка отображения графиков на виджете."""
+        """Настройка отображения графиков на виджете. Записи без данных
+        отображаются по эскизу до увеличения масштаба."""
         pos = 0
         for record in self.records:
-            if record.data is None:
+            if record.data is not None:
+                data = StoredValues(record.data)
+            elif record.preview is not None:
+                data = SweepPreview(record.preview)
+            else:
                 continue
-            if not isinstance(record.data, memoryview):
-                record.data = memoryview(record.data)
-            data = MeasuredValues(
-                **json.loads(record.data.tobytes(), use_decimal=True)
-            )
 
+            lines = []
             if 'R' in self.mode:
                 ref_r = self.canvas.axes_R.plot(
                     [], [], label=u'$R$, Ом',
                     color=cts.COLORS[pos], zorder=-1)[0]
-                ref_r.set_ydata(data.r)
-                ref_r.set_xdata(data.f)
+                ref_r.set_data(*data.curve('r'))
+                lines.append(('r', ref_r))
             if 'I' in self.mode:
                 ref_i = self.canvas.axes_I.plot(
                     [], [], label=u'$I$, Ом',
                     color=cts.COLORS[pos], zorder=-1)[0]
-                ref_i.set_ydata(data.i)
-                ref_i.set_xdata(data.f)
+                ref_i.set_data(*data.curve('i'))
+                lines.append(('i', ref_i))
             if 'Ph' in self.mode:
                 ref_ph = self.canvas.axes_Ph.plot(
                     [], [], label=u'$Ph$, Ом',
                     color=cts.COLORS[pos], zorder=-1)[0]
-                ref_ph.set_ydata(data.ph)
-                ref_ph.set_xdata(data.f)
+                ref_ph.set_data(*data.curve('ph'))
+                lines.append(('ph', ref_ph))
+            if isinstance(data, SweepPreview):
+                self.previews.append((record, data, lines))
             pos += 1
 
         if 'R' in self.mode:
@@ -262,8 +269,31 @@ class ComparePlotTab(QObject):
             self.canvas.axes_Ph.relim()
             self.canvas.axes_Ph.autoscale_view()
 
+        if self.previews and self.load_data is not None:
+            for axes in self.canvas.figure.axes:
+                axes.callbacks.connect('xlim_changed', self.xlim_changed)
         self.canvas.draw()
 
+    def xlim_changed(self, axes) -> None:
+        """При увеличении масштаба графики по эскизам заменяются полными
+        данными записей."""
+        if not self.previews:
+            return
+        first = min(preview.first for _, preview, _ in self.previews)
+        last = max(preview.last for _, preview, _ in self.previews)
+        left, right = axes.get_xlim()
+        if right - left > (last - first) * cts.PREVIEW_ZOOM:
+            return
+        previews, self.previews = self.previews, []
+        for record, _, lines in previews:
+            record.data = self.load_data(record)
+            if record.data is None:
+                continue
+            data = StoredValues(record.data)
+            for key, line in lines:
+                line.set_data(*data.curve(key))
+        self.canvas.draw_idle()
+
 
 class PlotTab(QObject):
     """Класс описывающий вкладку QTabwidget и графики."""
@@ -273,6 +303,7 @@ class PlotTab(QObject):
 
         self.record: Record = record
         self.data = MeasuredValues()
+        self.live_stat = LiveStat()
         self.update_range_signal: pyqtSignal = update_range_signal
         self.start_freq = None
         self.range_freq = None
@@ -371,14 +402,24 @@ class PlotTab(QObject):
         self.canvas.axes_2_1.legend(loc='upper left')
         self.canvas.axes_2_2.legend(loc='upper right')
 
-    @pyqtSlot(MeasuredValue)
-    def get_data(self, data: MeasuredValue) -> None:
-        """Добавление данных в локальное хранилище."""
-        self.data.add_value(data)
+    @pyqtSlot(MeasuredValues)
+    def get_data(self, block: MeasuredValues) -> None:
+        """Добавление блока точек в локальное хранилище и уточнение
+        параметров резонанса."""
+        self.data.extend(block)
+        self.live_stat.update(self.data)
 
     def set_data(self, data: MeasuredValue) -> None:
         """"""
         self.data = data
+        self.live_stat = LiveStat()
+
+    def show_stat(self, stat: dict) -> None:
+        """Вывод F, R и Q. Q равно None, пока оно не рассчитано."""
+        quality_factor = '—' if stat['Q'] is None else stat['Q']
+        self.label_frequency.setText(f"F = {stat['F']} Гц")
+        self.label_resistance.setText(f"R = {stat['R']} Ом")
+        self.label_quality_factor.setText(f"Q = {quality_factor}")
 
 
 class PlotUpdateWorker(QObject):
@@ -389,7 +430,7 @@ class PlotUpdateWorker(QObject):
     @pyqtSlot(PlotTab)
     def draw(self, plottab: PlotTab) -> None:
         """Обновление графиков."""
-        if not plottab.data.f:
+        if not len(plottab.data):
             return
         data_freq = plottab.data.f
         data_z = plottab.data.z
@@ -428,5 +469,6 @@ class PlotUpdateWorker(QObject):
         plottab.canvas.axes_2_1.set_xbound(f_start, f_end)
         plottab.canvas.axes_2_2.set_xbound(f_start, f_end)
 
-        plottab.canvas.draw()
-        plottab.canvas.flush_events()
+        # Перерисовка откладывается до цикла событий и объединяется с
+        # уже запрошенной, без повторного входа в обработку событий
+        plottab.canvas.draw_idle()
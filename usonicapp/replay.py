@@ -0,0 +1,108 @@
+"""Повторная обработка сырых измерений без подключения к стенду.
+
+Пересчитывает сохраненные коды АЦП (журналы *.usj или поле raw_data
+записей локальной БД) и параметры calc_stat. Позволяет проверить
+изменения формул и констант INDEX_I/INDEX_U на реальных данных, а также
+замерить скорость обработки.
+
+Пример запуска:
+    python replay.py journal/*.usj
+    python replay.py --sqlite db/usonicApp.db --exact
+"""
+import argparse
+import glob
+import time
+from decimal import Decimal
+
+from calc_stat import FITS, calc_stat
+from converter import convert_codes, round_values
+from journal import decode_sweeps, read_journal
+from serialport import MeasuredValues, RawMeasuredValue, SerialPortManager
+
+
+def convert_sweep(sweep, exact: bool = False) -> MeasuredValues:
+    """Пересчет кодов измерения в MeasuredValues."""
+    freqs = sweep.freqs / 100
+    if not exact:
+        return MeasuredValues.from_arrays(
+            round_values(convert_codes(sweep.codes, sweep.calibration, freqs))
+        )
+    data = MeasuredValues()
+    for codes, f in zip(sweep.codes.tolist(), freqs.tolist()):
+        data.add_value(SerialPortManager.calc_data(
+            RawMeasuredValue(*(Decimal(code) for code in codes)),
+            sweep.calibration,
+            f,
+        ))
+    return data
+
+
+def load_sqlite_sweeps(path: str) -> list:
+    """Сырые измерения, сохраненные в записях локальной БД."""
+    from models import Record
+    from peewee import SqliteDatabase
+
+    db = SqliteDatabase(path)
+    sweeps = []
+    with db.bind_ctx([Record]):
+        query = Record.select(Record.raw_data).where(
+            Record.raw_data.is_null(False))
+        for record in query:
+            sweeps.extend(decode_sweeps(bytes(record.raw_data)))
+    db.close()
+    return sweeps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('journals', nargs='*', help='Файлы журнала *.usj')
+    parser.add_argument('--sqlite', help='Путь к локальной БД')
+    parser.add_argument(
+        '--exact', action='store_true', help='Точный расчет в Decimal')
+    parser.add_argument(
+        '--fit', choices=FITS,
+        help='Уточнение частот и Q между точками измерения')
+    parser.add_argument(
+        '--quiet', action='store_true', help='Выводить только итоги')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sweeps = []
+    for pattern in args.journals:
+        for path in sorted(glob.glob(pattern)):
+            sweeps.extend(read_journal(path))
+    if args.sqlite:
+        sweeps.extend(load_sqlite_sweeps(args.sqlite))
+    read_time = time.perf_counter() - start
+
+    convert_time = stat_time = 0.0
+    points = 0
+    for sweep in sweeps:
+        if not len(sweep.freqs):
+            continue
+        start = time.perf_counter()
+        data = convert_sweep(sweep, args.exact)
+        convert_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        stat = calc_stat(data, exact=args.exact, fit=args.fit)
+        stat_time += time.perf_counter() - start
+        points += len(sweep.freqs)
+        if not args.quiet:
+            print(
+                f'{sweep.date:%d-%m-%Y %H:%M:%S}  точек: {len(sweep.freqs)}'
+                f'  калибровка: {sweep.calibration}  {stat}'
+            )
+
+    total = read_time + convert_time + stat_time
+    print(
+        f'Измерений: {len(sweeps)}, точек: {points}. '
+        f'Чтение: {read_time:.3f} c, пересчет: {convert_time:.3f} c, '
+        f'calc_stat: {stat_time:.3f} c'
+    )
+    if total:
+        print(f'Скорость: {points / total:.0f} точек/с')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,24 @@
 from __future__ import annotations
 
 import math
+import os
 import struct
-from collections import defaultdict
-from dataclasses import dataclass, field
+import time
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass, field, replace
 from decimal import Decimal
+from typing import ClassVar
 
 import constants as cts
+import numpy as np
 from config import settings
-from PyQt5.QtCore import QIODevice, QObject, QTimer, pyqtSignal, pyqtSlot
+from converter import (DECIMALS, QUANTIZE, convert_codes, parse_codes,
+                       round_values)
+from freqplan import FrequencyPlan
+from journal import RawFrameJournal
+from PyQt5.QtCore import (QIODevice, QObject, QThread, QTimer, pyqtSignal,
+                          pyqtSlot)
 from PyQt5.QtSerialPort import QSerialPort, QSerialPortInfo
 
 
@@ -32,271 +42,1081 @@ class MeasuredValue:
     ph: Decimal
     i: Decimal
     u: Decimal
+    # Отклонение Z при усреднении нескольких замеров на частоте
+    z_std: Decimal = None
+
+
+def column_property(key: str) -> property:
+    """Столбец MeasuredValues в виде представления массива без копирования."""
+    def getter(self) -> np.ndarray:
+        return self.arrays[key][:self.size]
+    return property(getter)
 
 
-@dataclass
 class MeasuredValues:
-    f: list = field(default_factory=list)
-    z: list = field(default_factory=list)
-    r: list = field(default_factory=list)
-    x: list = field(default_factory=list)
-    ph: list = field(default_factory=list)
-    i: list = field(default_factory=list)
-    u: list = field(default_factory=list)
+    """Измеренные значения прохода, хранящиеся по столбцам.
+
+    Каждая величина хранится в массиве float64. Место выделяется заранее
+    по числу точек плана (reserve) и удваивается при нехватке. Атрибуты
+    f, z, r, x, ph, i, u и z_std - представления массивов NumPy без
+    копирования. Отклонение z_std пусто, если хотя бы у одной точки его
+    нет.
+
+    Сохраняемый формат прежний: to_dict возвращает списки Decimal, как
+    dataclasses.asdict, а конструктор принимает такие списки.
+    """
+    COLUMNS = ('f', 'z', 'r', 'x', 'ph', 'i', 'u')
+    __slots__ = ('arrays', 'size', 'has_std', '__weakref__')
+
+    f = column_property('f')
+    z = column_property('z')
+    r = column_property('r')
+    x = column_property('x')
+    ph = column_property('ph')
+    i = column_property('i')
+    u = column_property('u')
+
+    def __init__(self, capacity: int = 0, **columns) -> None:
+        unknown = set(columns) - set(self.COLUMNS) - {'z_std'}
+        if unknown:
+            raise TypeError(f'Неизвестные столбцы: {", ".join(unknown)}')
+        self.size: int = len(columns.get('f', ()))
+        capacity = max(capacity, self.size)
+        self.arrays: dict = {
+            key: np.empty(capacity, dtype=np.float64)
+            for key in self.COLUMNS + ('z_std',)
+        }
+        for key, values in columns.items():
+            if len(values):
+                self.arrays[key][:self.size] = np.asarray(
+                    values, dtype=np.float64)
+        z_std = columns.get('z_std')
+        self.has_std: bool = (
+            self.size > 0 and z_std is not None and len(z_std) == self.size)
+
+    @classmethod
+    def from_arrays(cls, values: dict) -> MeasuredValues:
+        """Создает набор значений из округленных массивов, полученных
+        при векторном пересчете converter.convert_codes."""
+        return cls(**{key: values[key] for key in cls.COLUMNS})
+
+    @property
+    def z_std(self) -> np.ndarray:
+        return self.arrays['z_std'][:self.size if self.has_std else 0]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f'MeasuredValues(size={self.size})'
+
+    def reserve(self, capacity: int) -> None:
+        """Выделяет место не менее чем под capacity точек."""
+        if capacity <= len(self.arrays['f']):
+            return
+        for key, array in self.arrays.items():
+            resized = np.empty(capacity, dtype=np.float64)
+            resized[:self.size] = array[:self.size]
+            self.arrays[key] = resized
+
+    def append(self, row: dict) -> None:
+        """Добавляет точку, заданную словарем значений столбцов."""
+        if self.size == len(self.arrays['f']):
+            self.reserve(max(2 * self.size, 64))
+        index = self.size
+        for key in self.COLUMNS:
+            self.arrays[key][index] = row[key]
+        z_std = row.get('z_std')
+        if z_std is not None:
+            self.arrays['z_std'][index] = z_std
+        self.has_std = z_std is not None and (self.has_std or index == 0)
+        self.size += 1
 
     def add_value(self, value: MeasuredValue) -> None:
-        """Добавляем новый набор значений к текущим спискам."""
-        self.f.append(value.f)
-        self.z.append(value.z)
-        self.r.append(value.r)
-        self.x.append(value.x)
-        self.ph.append(value.ph)
-        self.i.append(value.i)
-        self.u.append(value.u)
+        """Добавляем новый набор значений к текущим столбцам."""
+        self.append(value.__dict__)
+
+    def extend(self, other: MeasuredValues) -> None:
+        """Добавляет все точки другого набора одним копированием."""
+        if not len(other):
+            return
+        start, end = self.size, self.size + len(other)
+        if end > len(self.arrays['f']):
+            self.reserve(max(2 * self.size, end))
+        for key in self.COLUMNS + ('z_std',):
+            self.arrays[key][start:end] = other.arrays[key][:len(other)]
+        self.has_std = other.has_std and (self.has_std or start == 0)
+        self.size = end
+
+    def columns(self) -> dict:
+        """Представления всех столбцов без копирования."""
+        return {key: getattr(self, key) for key in self.COLUMNS}
+
+    def to_dict(self) -> dict:
+        """Столбцы в виде списков Decimal с прежним округлением, для
+        сохранения в записи. Столбец z_std добавляется, только если он
+        есть: прежние версии программы его не знают."""
+        result = {}
+        for key in self.COLUMNS + (('z_std',) if self.has_std else ()):
+            quantum = QUANTIZE[key if key != 'z_std' else 'z']
+            result[key] = [
+                Decimal(str(item)).quantize(quantum)
+                for item in getattr(self, key).tolist()
+            ]
+        return result
+
+
+@dataclass
+class PendingPoint:
+    """Запрос частоты, отправленный на COM-порт и ожидающий ответа."""
+    freq: int
+    sent_at: float = 0.0
+    first_sent_at: float = 0.0
+    attempts: int = 0
+    warmup: bool = False
+
+
+@dataclass
+class SweepCheckpoint:
+    """Состояние прохода, с которого он продолжается после потери связи.
+
+    Точки передаются в порядке плана, а частота с номером 0 служит только
+    для прогрева, поэтому первая непринятая частота имеет номер
+    points + 1.
+    """
+    calibration: Decimal = None
+    factory_number: int = None
+    points: int = 0
+    suspended_at: float = 0.0
+    resumes: int = 0
+
+    @property
+    def position(self) -> int:
+        return self.points + 1
+
+
+class PointAverage:
+    """Усреднение нескольких замеров на одной частоте.
+
+    Отдельные замеры не хранятся: среднее значение каждой величины и
+    дисперсия Z обновляются по алгоритму Уэлфорда.
+    """
+    COLUMNS = ('z', 'r', 'x', 'ph', 'i', 'u')
+
+    def __init__(self, freq: int, samples: int) -> None:
+        self.freq: int = freq
+        self.samples: int = samples
+        self.remeasured: int = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """Сброс накопленных замеров перед повторным измерением."""
+        self.count: int = 0
+        self.mean: dict = dict.fromkeys(self.COLUMNS, 0.0)
+        self.m2: float = 0.0
+
+    def add(self, row: dict) -> None:
+        """Учет замера, заданного словарем значений величин."""
+        self.count += 1
+        delta_z = row['z'] - self.mean['z']
+        for key in self.COLUMNS:
+            self.mean[key] += (row[key] - self.mean[key]) / self.count
+        self.m2 += delta_z * (row['z'] - self.mean['z'])
+
+    @property
+    def complete(self) -> bool:
+        return self.count >= self.samples
+
+    @property
+    def z_std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    @property
+    def spread(self) -> float:
+        """Относительное отклонение Z, %."""
+        return 100 * self.z_std / self.mean['z'] if self.mean['z'] else 0.0
+
+    def result(self) -> dict:
+        """Усредненные значения с округлением, как в calc_data."""
+        row = {
+            key: round(value, DECIMALS[key])
+            for key, value in self.mean.items()
+        }
+        row['f'] = self.freq / 100
+        row['z_std'] = round(self.z_std, DECIMALS['z'])
+        return row
+
+
+class RttEstimator:
+    """Оценка времени ответа устройства по аналогии с RFC 6298.
+
+    Сглаженное среднее и отклонение времени ответа задают таймаут
+    повторной отправки. После каждого таймаута он удваивается, пока не
+    будет получен новый замер. Времена указываются в миллисекундах.
+    """
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+
+    def __init__(self, initial: int) -> None:
+        self.initial: int = initial
+        self.srtt = None
+        self.rttvar = None
+        self.rto: float = initial
+        self.backoff_factor: int = 1
+
+    def add_sample(self, rtt: float) -> None:
+        """Учет времени ответа на запрос, отправленный один раз."""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (
+                (1 - self.BETA) * self.rttvar
+                + self.BETA * abs(self.srtt - rtt))
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self.rto = min(
+            max(self.srtt + self.K * self.rttvar, cts.TIMER_RTO_MINIMUM),
+            cts.TIMER_RTO_MAXIMUM,
+        )
+        self.backoff_factor = 1
+
+    def backoff(self) -> None:
+        """Увеличение таймаута после отсутствия ответа."""
+        if self.rto * self.backoff_factor < cts.TIMER_RTO_MAXIMUM:
+            self.backoff_factor *= 2
+
+    def timeout(self) -> int:
+        """Текущий таймаут ожидания ответа."""
+        return math.ceil(
+            min(self.rto * self.backoff_factor, cts.TIMER_RTO_MAXIMUM))
+
+
+@dataclass
+class SweepMetrics:
+    """Показатели скорости сбора данных за один проход по частотам.
+
+    Время ответа на каждую точку учитывается в гистограмме с верхними
+    границами столбцов LATENCY_BINS (мс), последний столбец - ответы
+    дольше последней границы. Время расчета указывается в секундах.
+    """
+    LATENCY_BINS: ClassVar[tuple] = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: float = 0.0
+    points: int = 0
+    retries: int = 0
+    timeouts: int = 0
+    remeasured: int = 0
+    calc_time: float = 0.0
+    latency_sum: float = 0.0
+    latency_max: float = 0.0
+    latency_counts: list = field(
+        default_factory=lambda: [0] * (len(SweepMetrics.LATENCY_BINS) + 1))
+
+    def add_latency(self, latency: float) -> None:
+        self.latency_counts[bisect_left(self.LATENCY_BINS, latency)] += 1
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    @property
+    def duration(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def rate(self) -> float:
+        """Скорость, точек в секунду."""
+        duration = self.duration
+        return self.points / duration if duration > 0 else 0.0
+
+    @property
+    def latency_mean(self) -> float:
+        count = sum(self.latency_counts)
+        return self.latency_sum / count if count else 0.0
+
+    def snapshot(self) -> SweepMetrics:
+        """Копия для передачи в основной поток."""
+        return replace(self, latency_counts=list(self.latency_counts))
+
+    def to_dict(self) -> dict:
+        """Показатели для сохранения в записи."""
+        return {
+            'points': self.points,
+            'duration': round(self.duration, 3),
+            'rate': round(self.rate, 1),
+            'retries': self.retries,
+            'timeouts': self.timeouts,
+            'remeasured': self.remeasured,
+            'calc_time': round(self.calc_time, 4),
+            'latency_mean': round(self.latency_mean, 2),
+            'latency_max': round(self.latency_max, 2),
+            'latency_bins': list(self.LATENCY_BINS),
+            'latency_counts': self.latency_counts,
+        }
+
+    def summary(self) -> str:
+        text = (
+            f'{self.rate:.0f} точек/с, ответ {self.latency_mean:.1f} мс '
+            f'(макс. {self.latency_max:.0f} мс), повторов {self.retries}, '
+            f'таймаутов {self.timeouts}, расчет {self.calc_time * 1000:.0f} мс'
+        )
+        if self.remeasured:
+            text += f', перемерено частот {self.remeasured}'
+        return text
+
+
+def elapsed_ms(start: float) -> float:
+    """Время в миллисекундах, прошедшее с момента start."""
+    return (time.monotonic() - start) * 1000
+
+
+def retry_allowed(attempts: int, started_at: float) -> bool:
+    """Повторная отправка разрешена, пока не исчерпаны попытки или не
+    истекло минимальное время ожидания TIMER_RETRY_PATIENCE."""
+    return (
+        attempts < cts.ATTEMPTS_MAXIMUM
+        or elapsed_ms(started_at) < cts.TIMER_RETRY_PATIENCE
+    )
 
 
 def convert_bytes_to_decimal(value: bytes) -> Decimal:
     return Decimal(int.from_bytes(value, byteorder='little'))
 
 
+class FrameDecoder:
+    """Потоковый разбор посылок, поступающих с COM-порта.
+
+    Буфер сохраняется между вызовами readyRead: полные посылки извлекаются
+    за один линейный проход, а неполный хвост ожидает следующего чтения.
+    """
+    HEADER_LENGTH = 2
+
+    def __init__(self, commands: dict = cts.COMMANDS) -> None:
+        self.commands: dict = commands
+        self.buffer: bytearray = bytearray()
+
+    def clear(self) -> None:
+        """Очистка буфера, например, при переподключении порта."""
+        self.buffer.clear()
+
+    def feed(self, data: bytes) -> list[tuple[bytes, bytes]]:
+        """Добавляет данные в буфер и возвращает список полных посылок
+        в порядке поступления в виде пар (команда, данные)."""
+        buffer = self.buffer
+        buffer += data
+        size = len(buffer)
+        header = self.HEADER_LENGTH
+        frames = []
+        pos = 0
+        while size - pos >= header:
+            command = bytes(buffer[pos:pos + header])
+            length = self.commands.get(command)
+            if length is None:
+                # Мусор на линии - сдвигаемся на байт и ищем заголовок
+                pos += 1
+                continue
+            end = pos + header + length
+            if end > size:
+                # Посылка пришла не полностью, ждем остаток
+                break
+            frames.append((command, bytes(buffer[pos + header:end])))
+            pos = end
+        del buffer[:pos]
+        return frames
+
+
 class SerialPortManager(QObject):
-    """Вспомогательный класс для работы с COM портом."""
+    """Вспомогательный класс для работы с COM портом.
+
+    Объект переносится в отдельный поток сбора данных вместе с дочерним
+    QSerialPort и таймерами, с интерфейсом взаимодействует только через
+    сигналы.
+    """
     signal_port_checked = pyqtSignal(bool)
-    signal_send_data = pyqtSignal(MeasuredValue)
+    signal_send_data = pyqtSignal(MeasuredValues)
     signal_calibration_response = pyqtSignal()
     signal_stop_data_transfer = pyqtSignal()
+    # Передача остановлена, последние точки уже отправлены
+    signal_transfer_stopped = pyqtSignal()
     signal_transfer_progress_change = pyqtSignal(int)
+    signal_raw_data = pyqtSignal(bytes)
+    signal_metrics = pyqtSignal(SweepMetrics)
 
-    def __init__(self) -> None:
+    def __init__(self, port_name: str = None) -> None:
         super().__init__()
-        self.serial: QSerialPort = QSerialPort()
+        self.serial: QSerialPort = QSerialPort(self)
         self.serial.setBaudRate(115200)
         self.serial.setStopBits(QSerialPort.StopBits.OneStop)
         self.serial.setParity(QSerialPort.Parity.NoParity)
 
-        self.serial.readyRead.connect(self.read_data)
+        self.decoder: FrameDecoder = FrameDecoder()
+        # Порт дополнительного стенда задается явно, основной стенд
+        # работает с портом из настроек
+        self.port_name: str = port_name
+        self.journal: RawFrameJournal = RawFrameJournal(suffix=port_name)
 
         self.factory_number = None
         self.calibration = None
-        self.serial_port: str = settings.COM_PORT
+        self.serial_port: str = self.current_port_name()
+        # Кэш состояния подключения, None - порт еще не проверялся
+        self.connected = None
+        self.port_available = None
+        self.probe_failures: int = 0
+        self.next_probe_at: float = 0.0
+        self.last_response_at: float = 0.0
         self.transfer_status: bool = False
         # self.current_freq = None
-        self.start_freq = None
-        self.freq_list: list = []
-        self.attempts_number: int = 0
+        self.plan: FrequencyPlan = FrequencyPlan()
+        self.in_flight: deque = deque()
+        self.received: list = []
+        # Очередь замеров (частота, прогрев) и усреднение по частотам
+        self.sample_queue: deque = deque()
+        self.averages: dict = {}
+        self.oversampling: int = 1
+        self.checkpoint: SweepCheckpoint = SweepCheckpoint()
+        # Блок точек, еще не переданных основному окну
+        self.block: MeasuredValues = MeasuredValues(cts.BLOCK_POINTS)
+        # Посылки точек блока, пересчитываемые при его передаче
+        self.block_points: list = []
+        self.suspended: bool = False
+        # Окно ждет повторной отправки, пока не прекратятся опоздавшие
+        # ответы на прежнюю отправку
+        self.retry_pending: bool = False
+        self.window: int = 1
         self.settings_attempts_number: int = 0
         self.last_command = None
+        self.last_command_sent_at: float = 0.0
+        self.settings_started_at: float = 0.0
+        self.check_sent_at: float = 0.0
+        self.metrics: SweepMetrics = SweepMetrics()
+        self.metrics_sent_at: float = 0.0
+        # Оценки времени ответа для каждого типа запросов
+        self.rtt: dict = {
+            cts.CONNECTION_CHECK: RttEstimator(cts.TIMER_RESPONSE),
+            cts.DATA: RttEstimator(cts.TIMER_DATA_RECEIVE),
+            cts.VOLTAGE: RttEstimator(cts.TIMER_SETTINGS_REQUEST),
+            cts.CALIBRATION: RttEstimator(cts.TIMER_SETTINGS_REQUEST),
+        }
 
+    @pyqtSlot()
     def init_timers(self) -> None:
-        """Настройка и запуск таймеров."""
-        self.check_connection_timer = QTimer()
+        """Настройка и запуск таймеров. Вызывается при старте потока,
+        чтобы таймеры принадлежали потоку сбора данных."""
+        if self.thread() is not QThread.currentThread():
+            raise RuntimeError(
+                'SerialPortManager должен запускаться в своем потоке')
+        # Сигналы порта подключаются после moveToThread, чтобы слоты
+        # выполнялись в потоке сбора данных
+        self.serial.readyRead.connect(self.read_data)
+        self.serial.errorOccurred.connect(self.serial_error)
+
+        self.check_connection_timer = QTimer(self)
         self.check_connection_timer.setInterval(cts.TIMER_CHECK_SERIAL_PORT)
-        self.check_connection_timer.timeout.connect(self.check_serial_port)
+        self.check_connection_timer.timeout.connect(self.watch_port)
         self.check_connection_timer.start()
 
-        self.response_serial_port_timer = QTimer()
+        self.response_serial_port_timer = QTimer(self)
+        self.response_serial_port_timer.setSingleShot(True)
         self.response_serial_port_timer.setInterval(cts.TIMER_RESPONSE)
         self.response_serial_port_timer.timeout.connect(
             self.no_response_serial_port)
 
-        self.data_receive_timer = QTimer()
+        self.data_receive_timer = QTimer(self)
+        self.data_receive_timer.setSingleShot(True)
         self.data_receive_timer.setInterval(cts.TIMER_DATA_RECEIVE)
         self.data_receive_timer.timeout.connect(self.reconnection)
 
-        self.settings_request_timer = QTimer()
+        self.settings_request_timer = QTimer(self)
+        self.settings_request_timer.setSingleShot(True)
         self.settings_request_timer.setInterval(cts.TIMER_SETTINGS_REQUEST)
         self.settings_request_timer.timeout.connect(
             self.reconnection_settings)
 
+        self.block_timer = QTimer(self)
+        self.block_timer.setSingleShot(True)
+        self.block_timer.setInterval(cts.TIMER_BLOCK)
+        self.block_timer.timeout.connect(self.flush_block)
+
+        self.resume_timer = QTimer(self)
+        self.resume_timer.setSingleShot(True)
+        self.resume_timer.setInterval(cts.TIMER_RESUME_PATIENCE)
+        self.resume_timer.timeout.connect(self.resume_timeout)
+
     @staticmethod
     def get_available_port_names() -> list[str]:
         """Возвращает список активных COM-портов."""
         return [port.portName() for port in QSerialPortInfo().availablePorts()]
 
     @staticmethod
-    def create_tasks(data) -> dict:
-        """Обработка входящих данных."""
-        tasks = defaultdict(list)
-        for command, length in cts.COMMANDS.items():
-            while True:
-                index = data.find(command)
-                if index == -1:
-                    break
-                start = index + len(command)
-                end = index + length + len(command)
-                tasks[command].append(data[start:end])
-                data = data[:index] + data[end:]
-        return tasks
+    def is_port_available(port_name: str) -> bool:
+        """Есть ли COM-порт в системе. Псевдотерминалы (например,
+        имитатор стенда) не попадают в список QSerialPortInfo и
+        проверяются по пути к устройству."""
+        if port_name in SerialPortManager.get_available_port_names():
+            return True
+        return os.path.isabs(port_name) and os.path.exists(port_name)
+
+    def current_port_name(self) -> str:
+        """Имя COM-порта, с которым работает менеджер."""
+        return self.port_name or settings.COM_PORT
+
+    def close_port(self) -> None:
+        if self.serial.isOpen() is True:
+            self.serial.close()
+        self.decoder.clear()
+
+    def set_connection_state(self, status: bool) -> None:
+        """Сохраняет состояние подключения. Сигнал отправляется только
+        при изменении состояния."""
+        if status == self.connected:
+            return
+        self.connected = status
+        self.signal_port_checked.emit(status)
+
+    @pyqtSlot()
+    def watch_port(self) -> None:
+        """Отслеживание COM-порта без обмена с устройством.
+
+        Проверка связи отправляется, только если порт выбран заново или
+        появился в системе, если устройство долго ничего не передавало, и
+        не чаще, чем позволяет пауза после неудачной проверки.
+        """
+        port_name = self.current_port_name()
+        available = self.is_port_available(port_name)
+        if port_name != self.serial_port or available != self.port_available:
+            self.close_port()
+            self.serial_port = port_name
+            self.port_available = available
+            self.probe_failures = 0
+            self.next_probe_at = 0.0
+            self.connected = None
+            self.factory_number = None
+            if not available:
+                self.set_connection_state(False)
+                return
+        if not available or self.response_serial_port_timer.isActive():
+            return
+        if (self.connected
+                and elapsed_ms(self.last_response_at) < cts.TIMER_IDLE_PROBE):
+            return
+        if time.monotonic() < self.next_probe_at:
+            return
+        self.check_serial_port()
 
     @pyqtSlot()
     def check_serial_port(self) -> None:
         """Запрос проверки связи для COM порта."""
         # Проверка изменения выбора порта в настройках
-        if self.serial_port != settings.COM_PORT:
-            if self.serial.isOpen() is True:
-                self.serial.close()
-            self.serial_port = settings.COM_PORT
+        if self.serial_port != self.current_port_name():
+            self.close_port()
+            self.serial_port = self.current_port_name()
         # Открываем порт, если он был закрыт
         if self.serial.isOpen() is False:
-            self.serial.setPortName(settings.COM_PORT)
+            self.serial.setPortName(self.serial_port)
             self.serial.open(QIODevice.ReadWrite)
+            self.decoder.clear()
         # Если ошибок нет, запускам таймер для ожидания ответа от порта
         if self.serial.error() == self.serial.SerialPortError.NoError:
+            self.check_sent_at = time.monotonic()
             self.serial.write(cts.CONNECTION_CHECK)
-            self.response_serial_port_timer.start()
+            self.response_serial_port_timer.start(
+                self.rtt[cts.CONNECTION_CHECK].timeout())
         else:
-            # Отправляем сигнал о недоступности порта
             self.serial.clearError()
             self.serial.close()
-            self.signal_port_checked.emit(False)
+            self.probe_failed()
+
+    def probe_failed(self) -> None:
+        """Неудачная проверка связи. Пауза до следующей проверки растет
+        вдвое после каждой неудачи."""
+        self.probe_failures += 1
+        delay = min(
+            cts.TIMER_CHECK_SERIAL_PORT * 2 ** (self.probe_failures - 1),
+            cts.TIMER_PROBE_BACKOFF_MAXIMUM,
+        )
+        self.next_probe_at = time.monotonic() + delay / 1000
+        self.set_connection_state(False)
 
     @pyqtSlot()
     def no_response_serial_port(self) -> None:
         """COM-порт не отвечает."""
-        self.signal_port_checked.emit(False)
+        self.rtt[cts.CONNECTION_CHECK].backoff()
+        self.probe_failed()
 
-    def get_transfer_status(self) -> bool:
-        """Возвращает текущий статус передачи данных."""
-        return self.transfer_status
-
-    def toggle_transfer_status(self) -> None:
-        """Меняет статус передачи данных на обратный."""
-        self.transfer_status = not self.transfer_status
+    @pyqtSlot(QSerialPort.SerialPortError)
+    def serial_error(self, error) -> None:
+        """Устройство отключено во время работы с открытым портом."""
+        if error != QSerialPort.SerialPortError.ResourceError:
+            return
+        self.serial.clearError()
+        self.close_port()
+        # Порт будет проверен сразу после повторного появления
+        self.port_available = False
+        if self.transfer_status and not self.suspended:
+            print('COM-порт отключен. Передача данных приостановлена')
+            self.suspend_transfer()
+        self.set_connection_state(False)
 
     @pyqtSlot()
     def reconnection_settings(self) -> None:
         """Попытка повторной отправки настроек, если COM-порт не отвечает."""
-        if self.settings_attempts_number < cts.ATTEMPTS_MAXIMUM:
+        estimator = self.rtt[self.last_command[:2]]
+        estimator.backoff()
+        self.metrics.timeouts += 1
+        if retry_allowed(
+                self.settings_attempts_number, self.settings_started_at):
             self.settings_attempts_number += 1
+            self.metrics.retries += 1
             print(
                 'Устройство не отвечает в процессе передачи настроек, попытка переподключения '
                 f'- {self.settings_attempts_number}.'
             )
-            self.serial.write(self.last_command)
+            self.send_settings_command(self.last_command)
             return
 
-        print('Устройство не отвечает. Завершение передачи данных')
         self.settings_attempts_number = 0
         self.settings_request_timer.stop()
+        # Калибровка уже получена: проход продолжится после
+        # восстановления связи.
+        if self.checkpoint.calibration is not None:
+            print('Устройство не отвечает. Передача данных приостановлена')
+            self.suspend_transfer()
+            return
+        print('Устройство не отвечает. Завершение передачи данных')
         self.stop_data_transfer()
         self.signal_stop_data_transfer.emit()
 
     @pyqtSlot()
     def reconnection(self) -> None:
         """Попытка повторной отправки данных, если COM-порт не
-        отвечает."""
-        if self.attempts_number < cts.ATTEMPTS_MAXIMUM:
-            self.attempts_number += 1
+        отвечает. Счетчик попыток ведется для каждой точки отдельно.
+
+        Ответ не содержит частоту, поэтому окно отправляется заново только
+        после паузы без ответов длиной в таймаут: иначе опоздавший ответ на
+        прежнюю отправку сдвинул бы данные по частоте.
+        """
+        if not self.in_flight:
+            self.data_receive_timer.stop()
+            return
+        if self.retry_pending:
+            self.retry_pending = False
+            self.send_data(False)
+            return
+        point = self.in_flight[0]
+        # Ответ мог уже прийти, пока поток был занят: сначала разбираем
+        # принятые данные
+        self.serial.waitForReadyRead(0)
+        if not self.in_flight or self.in_flight[0] is not point:
+            return
+        self.rtt[cts.DATA].backoff()
+        self.metrics.timeouts += 1
+        if retry_allowed(point.attempts, point.first_sent_at):
             print(
-                'Устройство не отвечаетв процессе передачи данных, попытка переподключения '
-                f'- {self.attempts_number}.'
+                'Устройство не отвечает в процессе передачи данных, '
+                f'попытка переподключения - {point.attempts + 1} '
+                f'(частота {point.freq / 100} Гц).'
             )
-            self.send_data(False)
+            self.retry_pending = True
+            self.data_receive_timer.start(self.rtt[cts.DATA].timeout())
             return
 
-        print('Устройство не отвечает. Завершение передачи данных')
-        self.attempts_number = 0
+        print('Устройство не отвечает. Передача данных приостановлена')
+        self.suspend_transfer()
+
+    def suspend_transfer(self) -> None:
+        """Приостановка прохода после потери связи.
+
+        Неподтвержденные запросы отбрасываются, план возвращается к первой
+        непринятой частоте. Проверка связи возобновляется, а при ответе
+        того же стенда проход продолжается с сохраненной калибровкой.
+        Если связь не восстановится за TIMER_RESUME_PATIENCE мс, передача
+        данных завершается.
+        """
+        self.suspended = True
+        self.retry_pending = False
+        self.checkpoint.suspended_at = time.monotonic()
+        self.flush_block()
         self.data_receive_timer.stop()
+        self.settings_request_timer.stop()
+        self.in_flight.clear()
+        self.received.clear()
+        self.sample_queue.clear()
+        self.averages.clear()
+        self.plan.position = min(self.checkpoint.position, len(self.plan))
+        self.probe_failures = 0
+        self.next_probe_at = 0.0
+        self.set_connection_state(False)
+        self.check_connection_timer.start()
+        self.resume_timer.start()
+
+    def resume_transfer(self) -> None:
+        """Продолжение прохода с первой непринятой частоты. Перед ней
+        повторно отправляется прогревочный запрос."""
+        if self.factory_number != self.checkpoint.factory_number:
+            print('К COM-порту подключен другой стенд. Завершение передачи данных')  # noqa
+            self.stop_data_transfer()
+            self.signal_stop_data_transfer.emit()
+            return
+        if not self.plan.remaining:
+            self.stop_data_transfer()
+            self.signal_stop_data_transfer.emit()
+            return
+        self.suspended = False
+        self.resume_timer.stop()
+        self.check_connection_timer.stop()
+        self.checkpoint.resumes += 1
+        self.calibration = self.checkpoint.calibration
+        print(
+            f'Связь восстановлена, продолжение передачи данных с частоты '
+            f'{self.plan[self.plan.position] / 100} Гц.'
+        )
+        self.serial.clear(QSerialPort.Direction.Input)
+        self.decoder.clear()
+        self.sample_queue.append((self.plan[self.plan.position], True))
+        self.set_voltage()
+
+    @pyqtSlot()
+    def resume_timeout(self) -> None:
+        """Связь не восстановилась."""
+        if not self.suspended:
+            return
+        print('Связь не восстановлена. Завершение передачи данных')
         self.stop_data_transfer()
+        self.signal_stop_data_transfer.emit()
 
-    def start_data_transfer(self, freq_list) -> None:
-        """Начало процесса передачи данных."""
+    @pyqtSlot(object)
+    def start_data_transfer(self, plan: FrequencyPlan) -> None:
+        """Начало процесса передачи данных по плану частот."""
+        self.transfer_status = True
         self.check_connection_timer.stop()
         self.response_serial_port_timer.stop()
-        self.start_freq = freq_list[0]
-        self.current_freq: int = freq_list[0]
-        self.freq_list = freq_list
+        self.plan = plan
+        self.plan.rewind()
+        self.checkpoint = SweepCheckpoint(factory_number=self.factory_number)
+        self.suspended = False
+        self.retry_pending = False
+        self.in_flight.clear()
+        self.received.clear()
+        self.sample_queue.clear()
+        self.averages.clear()
+        self.block_points.clear()
+        self.oversampling = settings.OVERSAMPLING
+        self.window = settings.PIPELINE_WINDOW
+        self.metrics = SweepMetrics()
+        self.metrics_sent_at = 0.0
+        self.journal.start(
+            write=settings.RAW_JOURNAL, keep=settings.SAVE_RAW_DATA)
         self.set_voltage()
 
+    @pyqtSlot()
     def stop_data_transfer(self) -> None:
         """Завершение процесса передачи данных."""
+        active = self.transfer_status
+        self.transfer_status = False
+        self.suspended = False
+        self.retry_pending = False
+        self.resume_timer.stop()
         self.data_receive_timer.stop()
+        self.flush_block()
+        self.in_flight.clear()
+        self.received.clear()
+        self.sample_queue.clear()
+        self.averages.clear()
         self.check_connection_timer.start()
+        if active:
+            if not self.metrics.finished_at:
+                self.metrics.finished_at = time.monotonic()
+            self.send_metrics(force=True)
+        raw_data = self.journal.finish_sweep()
+        self.journal.close()
+        if raw_data:
+            self.signal_raw_data.emit(raw_data)
+        self.signal_transfer_stopped.emit()
+
+    def send_settings_command(self, command: bytes) -> None:
+        """Отправка команды настройки и запуск таймера ожидания ответа."""
+        self.last_command = command
+        self.last_command_sent_at = time.monotonic()
+        self.settings_request_timer.start(self.rtt[command[:2]].timeout())
+        self.serial.write(command)
+
+    def settings_response(self, command: bytes) -> None:
+        """Учет времени ответа на команду настройки."""
+        self.settings_request_timer.stop()
+        if self.settings_attempts_number == 0:
+            self.rtt[command].add_sample(
+                elapsed_ms(self.last_command_sent_at))
+        self.settings_attempts_number = 0
 
     def calibration_request(self) -> None:
         """Запрос калибровок."""
-        self.settings_request_timer.start(cts.TIMER_SETTINGS_REQUEST)
-        self.last_command = cts.CALIBRATION
-        self.serial.write(self.last_command)
+        self.settings_started_at = time.monotonic()
+        self.send_settings_command(cts.CALIBRATION)
 
     def set_voltage(self) -> None:
         """Установка напряжения."""
-        self.settings_request_timer.start(cts.TIMER_SETTINGS_REQUEST)
-        self.last_command = cts.VOLTAGE + struct.pack('@B', settings.VOLTAGE)
-        self.serial.write(self.last_command)
+        self.settings_started_at = time.monotonic()
+        self.send_settings_command(
+            cts.VOLTAGE + struct.pack('@B', settings.VOLTAGE))
+
+    def send_point(self, point: PendingPoint) -> None:
+        """Отправка запроса одной частоты на COM-порт."""
+        point.sent_at = time.monotonic()
+        if not point.first_sent_at:
+            point.first_sent_at = point.sent_at
+        self.in_flight.append(point)
+        self.serial.write(cts.DATA + struct.pack('<i', point.freq))
 
     def send_data(self, modify: bool = True) -> None:
-        """Отправка данных на COM-порт."""
+        """Отправка данных на COM-порт.
+
+        Запросы отправляются окнами по self.window частот. Ответ устройства
+        не содержит частоту, поэтому ответы сопоставляются с запросами в
+        порядке отправки и принимаются только после получения ответов на
+        все запросы окна. При повторной отправке (modify=False) окно
+        передается заново целиком: потерянный ответ не приводит к сдвигу
+        данных по частоте. В режиме усреднения каждая частота
+        запрашивается OVERSAMPLING раз подряд.
+        """
         if modify is True:
-            self.current_freq = int(self.freq_list[0] * 100)  # не точно
-            self.freq_list.pop(0)
-        self.serial.write(
-            cts.DATA + struct.pack('<i', self.current_freq)
-        )
-        self.data_receive_timer.start(cts.TIMER_DATA_RECEIVE)
+            while len(self.in_flight) < self.window:
+                if not self.sample_queue:
+                    warmup = self.plan.position == 0
+                    freq = self.plan.next()
+                    if freq is None:
+                        break
+                    samples = 1 if warmup else self.oversampling
+                    self.sample_queue.extend([(freq, warmup)] * samples)
+                freq, warmup = self.sample_queue.popleft()
+                self.send_point(PendingPoint(freq=freq, warmup=warmup))
+        else:
+            pending = [point for point, _ in self.received]
+            pending.extend(self.in_flight)
+            self.received.clear()
+            self.in_flight.clear()
+            # Опоздавшие ответы окна не должны попасть в новую отправку
+            self.serial.clear(QSerialPort.Direction.Input)
+            self.decoder.clear()
+            self.metrics.retries += len(pending)
+            for point in pending:
+                point.attempts += 1
+                self.send_point(point)
+        self.restart_data_timer()
+
+    def send_metrics(self, force: bool = False) -> None:
+        """Передача показателей скорости не чаще, чем раз в
+        TIMER_METRICS мс."""
+        if not force and elapsed_ms(self.metrics_sent_at) < cts.TIMER_METRICS:
+            return
+        self.metrics_sent_at = time.monotonic()
+        self.signal_metrics.emit(self.metrics.snapshot())
+
+    def restart_data_timer(self) -> None:
+        """Запуск таймера ожидания ответа на самый старый запрос с учетом
+        текущей оценки времени ответа."""
+        if not self.in_flight:
+            self.data_receive_timer.stop()
+            return
+        remaining = (
+            self.rtt[cts.DATA].timeout()
+            - elapsed_ms(self.in_flight[0].sent_at))
+        self.data_receive_timer.start(max(1, math.ceil(remaining)))
 
-    # Возможно использовать декоратор, но проверить тип посылки
+    @pyqtSlot()
     def read_data(self):
         """Слот, отвечающий за чтение и обработку поступающих данных."""
         rdata = self.serial.readAll()
-        tasks = self.create_tasks(rdata.data())
-        for command, data_list in tasks.items():
-            for data in data_list:
-                if command == cts.CONNECTION_CHECK:
-                    self.serial_port = self.serial.portName()
-                    self.factory_number = int.from_bytes(
-                        data[:1],
-                        byteorder='little')
-                    self.response_serial_port_timer.stop()
-                    self.signal_port_checked.emit(True)
-                elif ((command == cts.DATA) and (self.transfer_status)):
-                    self.attempts_number = 0
-                    self.data_receive_timer.stop()
-
-                    # Если это первая итерация передачи данных, то пропускаем
-                    # ее из-за большого отклонения данных.
-                    f = self.current_freq / 100
-                    if self.start_freq == f:
-                        return self.send_data()
-
-                    received_data = RawMeasuredValue(
-                        v_ph_i=convert_bytes_to_decimal(data[0:2]),
-                        v_db_i=convert_bytes_to_decimal(data[2:4]),
-                        v_ph_u=convert_bytes_to_decimal(data[4:6]),
-                        v_db_u=convert_bytes_to_decimal(data[6:8]),
-                        v_ref=convert_bytes_to_decimal(data[8:10]),
-                        v_i=convert_bytes_to_decimal(data[10:12]),
-                    )
-
-                    measured_value = self.calc_data(
-                        raw_values=received_data,
-                        calibration=self.calibration,
-                        f=f,
-                    )
-                    # Возможно проблема
-                    self.signal_transfer_progress_change.emit(
-                         len(self.freq_list)
-                    )
-                    self.signal_send_data.emit(measured_value)
-                    if not self.freq_list:
-                        self.signal_stop_data_transfer.emit()
-                    else:
-                        self.send_data()
-                elif command == cts.VOLTAGE:
-                    self.settings_request_timer.stop()
-                    self.settings_attempts_number = 0
-                    self.calibration_request()
-                elif command == cts.CALIBRATION:
-                    self.settings_request_timer.stop()
-                    self.settings_attempts_number = 0
-                    self.calibration = convert_bytes_to_decimal(data[0:2])/1000
+        self.last_response_at = time.monotonic()
+        for command, data in self.decoder.feed(rdata.data()):
+            if command == cts.CONNECTION_CHECK:
+                factory_number = int.from_bytes(
+                    data[:1],
+                    byteorder='little')
+                # К тому же порту подключен другой стенд
+                if factory_number != self.factory_number:
+                    self.connected = None
+                self.factory_number = factory_number
+                self.response_serial_port_timer.stop()
+                if self.check_sent_at:
+                    self.rtt[command].add_sample(
+                        elapsed_ms(self.check_sent_at))
+                    self.check_sent_at = 0.0
+                self.probe_failures = 0
+                self.set_connection_state(True)
+                if self.suspended:
+                    self.resume_transfer()
+            elif ((command == cts.DATA) and (self.transfer_status)):
+                # Опоздавший ответ на окно, ожидающее повторной отправки:
+                # пауза без ответов отсчитывается заново
+                if self.retry_pending:
+                    self.data_receive_timer.start(
+                        self.rtt[cts.DATA].timeout())
+                    continue
+                # Ответ без ожидающего запроса (опоздавший после повторной
+                # отправки) пропускаем.
+                if not self.in_flight:
+                    continue
+                point = self.in_flight.popleft()
+                self.data_receive_timer.stop()
+                self.metrics.add_latency(elapsed_ms(point.sent_at))
+                # Время ответа учитываем только для точек, отправленных
+                # один раз, иначе неясно, на какую отправку пришел ответ.
+                if point.attempts == 0:
+                    self.rtt[cts.DATA].add_sample(elapsed_ms(point.sent_at))
+                # Ответы окна принимаются только все вместе: при потере
+                # одного из них окно отправляется повторно.
+                self.received.append((point, data))
+                if self.in_flight:
+                    self.restart_data_timer()
+                    continue
+
+                self.commit_window(self.received)
+                self.received.clear()
+                if not self.plan.remaining and not self.sample_queue:
+                    self.flush_block()
+                    self.metrics.finished_at = time.monotonic()
+                    self.signal_stop_data_transfer.emit()
+                else:
+                    self.send_metrics()
+                    self.send_data()
+            elif command == cts.VOLTAGE:
+                self.settings_response(command)
+                # После восстановления связи калибровка берется из
+                # сохраненного состояния прохода.
+                if self.checkpoint.resumes:
                     self.send_data()
                 else:
-                    print('Неизвестная команда.')
+                    self.calibration_request()
+            elif command == cts.CALIBRATION:
+                self.settings_response(command)
+                self.calibration = convert_bytes_to_decimal(data[0:2])/1000
+                self.checkpoint.calibration = self.calibration
+                self.journal.start_sweep(
+                    int.from_bytes(data[0:2], byteorder='little'),
+                    settings.VOLTAGE,
+                )
+                self.send_data()
+            else:
+                print('Неизвестная команда.')
+
+    def commit_window(self, received: list) -> None:
+        """Учет всех принятых точек окна. Без усреднения посылки
+        копятся в блоке и пересчитываются при его передаче (flush_block),
+        при усреднении окно пересчитывается сразу, чтобы решить, какие
+        частоты измерить заново."""
+        # Первую точку прохода пропускаем из-за большого отклонения данных
+        points = [item for item in received if not item[0].warmup]
+        if not points:
+            return
+        self.metrics.points += len(points)
+        for point, data in points:
+            self.journal.add_point(point.freq, data)
+        if self.oversampling == 1:
+            self.add_block_points(points)
+            return
+        values = self.convert_points(points)
+        columns = values.columns()
+        for index, (point, _) in enumerate(points):
+            self.add_sample(
+                point.freq,
+                {key: column[index] for key, column in columns.items()},
+            )
+
+    def convert_points(self, points: list) -> MeasuredValues:
+        """Пересчет посылок точек одним вызовом."""
+        started = time.perf_counter()
+        if settings.EXACT_CONVERSION:
+            # Точный расчет в Decimal для сверки результатов
+            values = MeasuredValues(len(points))
+            for point, data in points:
+                values.add_value(self.calc_data(
+                    raw_values=RawMeasuredValue(*(
+                        convert_bytes_to_decimal(data[n:n + 2])
+                        for n in range(0, len(data), 2))),
+                    calibration=self.calibration,
+                    f=point.freq / 100,
+                ))
+        else:
+            freqs = np.array([point.freq for point, _ in points]) / 100
+            values = MeasuredValues.from_arrays(round_values(convert_codes(
+                parse_codes(b''.join(data for _, data in points)),
+                self.calibration,
+                freqs,
+            )))
+        self.metrics.calc_time += time.perf_counter() - started
+        return values
+
+    def send_values(self, values: MeasuredValues) -> None:
+        """Добавление готовых точек в блок для основного окна."""
+        if not len(values):
+            return
+        self.checkpoint.points += len(values)
+        if not len(self.block):
+            self.block_timer.start()
+        self.block.extend(values)
+        if len(self.block) >= cts.BLOCK_POINTS:
+            self.flush_block()
+
+    def add_block_points(self, points: list) -> None:
+        """Добавление принятых посылок в блок без пересчета."""
+        self.checkpoint.points += len(points)
+        if not self.block_points and not len(self.block):
+            self.block_timer.start()
+        self.block_points.extend(points)
+        if len(self.block_points) + len(self.block) >= cts.BLOCK_POINTS:
+            self.flush_block()
+
+    @pyqtSlot()
+    def flush_block(self) -> None:
+        """Передача накопленного блока точек и хода измерения. Посылки
+        блока пересчитываются здесь одним вызовом. Блок передается
+        основному окну целиком, для новых точек создается новый."""
+        self.block_timer.stop()
+        if self.block_points:
+            self.block.extend(self.convert_points(self.block_points))
+            self.block_points = []
+        if not len(self.block):
+            return
+        block = self.block
+        self.block = MeasuredValues(cts.BLOCK_POINTS)
+        self.signal_send_data.emit(block)
+        self.signal_transfer_progress_change.emit(self.plan.remaining)
+
+    def add_sample(self, freq: int, row: dict) -> None:
+        """Учет одного из замеров частоты в режиме усреднения.
+
+        Частота, разброс Z на которой превышает OVERSAMPLING_SPREAD,
+        измеряется заново, но не более OVERSAMPLING_REMEASURE раз.
+        Усредненные значения передаются в порядке частот: частота,
+        ожидающая повторного измерения, задерживает следующие за ней.
+        """
+        average = self.averages.get(freq)
+        if average is None:
+            average = PointAverage(freq, self.oversampling)
+            self.averages[freq] = average
+        average.add(row)
+        if not average.complete:
+            return
+        if (average.spread > settings.OVERSAMPLING_SPREAD
+                and average.remeasured < settings.OVERSAMPLING_REMEASURE):
+            average.remeasured += 1
+            average.reset()
+            self.metrics.remeasured += 1
+            self.sample_queue.extend([(freq, False)] * self.oversampling)
+            return
+        values = MeasuredValues()
+        while self.averages:
+            average = next(iter(self.averages.values()))
+            if not average.complete:
+                break
+            del self.averages[average.freq]
+            values.append(average.result())
+        self.send_values(values)
 
     @staticmethod
     def calc_data(raw_values: RawMeasuredValue, calibration: Decimal, f: int) -> MeasuredValue:  # noqa
-        """Расчет параметров на основе данных от COM-порта."""
+        """Расчет параметров на основе данных от COM-порта. Точный расчет
+        в Decimal, быстрый табличный расчет - converter.convert_codes."""
         z = (calibration * pow(10, (((raw_values.v_db_u) - (raw_values.v_db_i))/600)))  # noqa
         ph = (raw_values.v_ph_i/10 - raw_values.v_ph_u/10)
         r = z * Decimal(math.cos(math.radians(ph)))
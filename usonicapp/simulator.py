@@ -0,0 +1,267 @@
+"""Имитатор ультразвукового стенда, работающий по протоколу COM-порта.
+
+Отвечает на посылки CONNECTION_CHECK, VOLTAGE, CALIBRATION и DATA,
+формируя коды АЦП по эквивалентной схеме пьезопреобразователя
+(параллельная емкость C0 и последовательный контур R1-L1-C1). Задержка,
+разброс задержки, потеря и разбиение ответов настраиваются.
+
+Имитатор работает через псевдотерминал Linux: путь к нему указывается в
+качестве COM_PORT. Пример запуска:
+    python simulator.py --latency 2 --jitter 1 --drop 0.01 --split 0.1
+    python simulator.py --bench 3000 --window 8
+"""
+import argparse
+import cmath
+import heapq
+import math
+import os
+import random
+import select
+import struct
+import threading
+import time
+import tty
+from dataclasses import dataclass
+
+import constants as cts
+from serialport import FrameDecoder
+
+# Длина данных входящих команд (без заголовка)
+REQUESTS = {
+    cts.DATA: 4,
+    cts.VOLTAGE: 1,
+    cts.CALIBRATION: 0,
+    cts.CONNECTION_CHECK: 0,
+}
+# Опорные коды, относительно которых строятся ответы
+CODE_REF = 2000
+CODE_PH_U = 1800
+
+
+@dataclass
+class EquivalentCircuit:
+    """Эквивалентная схема преобразователя."""
+    fs: float = 22000.0
+    r1: float = 30.0
+    q: float = 400.0
+    c0: float = 16.51e-9
+
+    def impedance(self, f: float) -> complex:
+        """Комплексное сопротивление на частоте f."""
+        w = 2 * math.pi * f
+        ws = 2 * math.pi * self.fs
+        l1 = self.q * self.r1 / ws
+        c1 = 1 / (ws * ws * l1)
+        z_motional = complex(self.r1, w * l1 - 1 / (w * c1))
+        z_c0 = complex(0, -1 / (w * self.c0))
+        return z_motional * z_c0 / (z_motional + z_c0)
+
+
+@dataclass
+class DeviceProfile:
+    """Параметры поведения имитатора."""
+    latency: float = 0.002
+    jitter: float = 0.0
+    drop: float = 0.0
+    split: float = 0.0
+    noise: float = 0.0
+    factory_number: int = 7
+    calibration: int = 1000
+
+
+class SimulatedDevice:
+    """Логика устройства без привязки к транспорту: process принимает
+    входящие байты и возвращает ответы с задержками."""
+    def __init__(self, circuit=None, profile=None, seed=None) -> None:
+        self.circuit: EquivalentCircuit = circuit or EquivalentCircuit()
+        self.profile: DeviceProfile = profile or DeviceProfile()
+        self.decoder: FrameDecoder = FrameDecoder(REQUESTS)
+        self.random = random.Random(seed)
+        self.voltage: int = 100
+        self.received: int = 0
+        self.dropped: int = 0
+        # Время отправки последнего ответа: ответы уходят строго по очереди
+        self.sent_until: float = 0.0
+
+    def encode_codes(self, f: float) -> bytes:
+        """Коды АЦП для частоты f, обратные SerialPortManager.calc_data."""
+        calibration = self.profile.calibration / 1000
+        z = self.circuit.impedance(f)
+        noise = self.random.gauss(0, self.profile.noise) if self.profile.noise else 0  # noqa
+        magnitude = abs(z) * (1 + noise)
+        ph = math.degrees(cmath.phase(z))
+        u = self.voltage
+        i = 1000 * u / magnitude
+
+        v_db_u = CODE_REF / 2 + 600 * math.log10(u / cts.INDEX_U)
+        v_db_i = v_db_u - 600 * math.log10(magnitude / calibration)
+        v_ph_i = CODE_PH_U + ph * 10
+        v_i = 2500 + 480 * math.log10(i / cts.INDEX_I)
+        codes = (v_ph_i, v_db_i, CODE_PH_U, v_db_u, CODE_REF, v_i)
+        return struct.pack(
+            '<6H', *(min(max(round(code), 0), 0xFFFF) for code in codes))
+
+    def reply(self, command: bytes, data: bytes) -> bytes:
+        """Ответ на одну входящую посылку."""
+        if command == cts.CONNECTION_CHECK:
+            return command + struct.pack('<H', self.profile.factory_number)
+        if command == cts.VOLTAGE:
+            self.voltage = data[0]
+            return command + struct.pack('<H', self.voltage)
+        if command == cts.CALIBRATION:
+            return command + struct.pack('<H', self.profile.calibration)
+        freq = struct.unpack('<i', data)[0]
+        return command + self.encode_codes(freq / 100)
+
+    def process(self, data: bytes, now: float) -> list:
+        """Обработка входящих байт. Возвращает список (время, байты)."""
+        profile = self.profile
+        result = []
+        for command, payload in self.decoder.feed(data):
+            self.received += 1
+            if command == cts.DATA and self.random.random() < profile.drop:
+                self.dropped += 1
+                continue
+            frame = self.reply(command, payload)
+            due = now + profile.latency + self.random.uniform(0, profile.jitter)  # noqa
+            due = max(due, self.sent_until)
+            if self.random.random() < profile.split:
+                cut = self.random.randint(1, len(frame) - 1)
+                result.append((due, frame[:cut]))
+                due += profile.latency / 2
+                result.append((due, frame[cut:]))
+            else:
+                result.append((due, frame))
+            self.sent_until = due
+        return result
+
+
+class PtyTransport(threading.Thread):
+    """Подключение имитатора к псевдотерминалу Linux."""
+    def __init__(self, device: SimulatedDevice) -> None:
+        super().__init__(daemon=True)
+        self.device: SimulatedDevice = device
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port_name: str = os.ttyname(self.slave)
+        self.running: bool = True
+
+    def run(self) -> None:
+        queue = []
+        sequence = 0
+        while self.running:
+            timeout = 0.05
+            if queue:
+                timeout = max(0.0, queue[0][0] - time.monotonic())
+            readable, _, _ = select.select([self.master], [], [], timeout)
+            if readable:
+                try:
+                    data = os.read(self.master, 4096)
+                except OSError:
+                    continue
+                for due, frame in self.device.process(data, time.monotonic()):
+                    heapq.heappush(queue, (due, sequence, frame))
+                    sequence += 1
+            now = time.monotonic()
+            while queue and queue[0][0] <= now:
+                os.write(self.master, heapq.heappop(queue)[2])
+
+    def stop(self) -> None:
+        self.running = False
+
+
+def bench(transport: PtyTransport, points: int, window: int) -> None:
+    """Замер скорости сбора данных SerialPortManager на имитаторе."""
+    from config import settings
+    from freqplan import FrequencyPlan
+    from PyQt5.QtCore import QCoreApplication
+    from serialport import SerialPortManager
+
+    app = QCoreApplication([])
+    settings.COM_PORT = transport.port_name
+    settings.PIPELINE_WINDOW = window
+    manager = SerialPortManager()
+    fs = transport.device.circuit.fs
+    plan = FrequencyPlan.uniform(fs - points / 2, fs + points / 2 + 1, 1)
+    received = []
+    started = {}
+
+    def port_checked(status):
+        if status and not started:
+            started['time'] = time.perf_counter()
+            manager.start_data_transfer(plan)
+
+    def finished():
+        elapsed = time.perf_counter() - started['time']
+        manager.stop_data_transfer()
+        print(
+            f'Точек: {len(received)}, время: {elapsed:.2f} c, '
+            f'скорость: {len(received) / elapsed:.0f} точек/с, '
+            f'потеряно ответов: {transport.device.dropped}'
+        )
+        print(manager.metrics.summary())
+        app.quit()
+
+    manager.signal_port_checked.connect(port_checked)
+    manager.signal_send_data.connect(
+        lambda block: received.extend(block.f.tolist()))
+    manager.signal_stop_data_transfer.connect(finished)
+    manager.init_timers()
+    manager.check_serial_port()
+    app.exec()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--fs', type=float, default=22000.0,
+                        help='Частота резонанса, Гц')
+    parser.add_argument('--r1', type=float, default=30.0,
+                        help='Сопротивление R1, Ом')
+    parser.add_argument('--q', type=float, default=400.0,
+                        help='Добротность')
+    parser.add_argument('--c0', type=float, default=16.51e-9,
+                        help='Емкость C0, Ф')
+    parser.add_argument('--latency', type=float, default=2.0,
+                        help='Задержка ответа, мс')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='Разброс задержки, мс')
+    parser.add_argument('--drop', type=float, default=0.0,
+                        help='Вероятность потери ответа DATA')
+    parser.add_argument('--split', type=float, default=0.0,
+                        help='Вероятность разбиения ответа на две части')
+    parser.add_argument('--noise', type=float, default=0.0,
+                        help='Относительный шум модуля сопротивления')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--bench', type=int, default=0,
+                        help='Количество точек для замера скорости')
+    parser.add_argument('--window', type=int, default=1,
+                        help='Окно конвейерной передачи при замере')
+    args = parser.parse_args()
+
+    device = SimulatedDevice(
+        circuit=EquivalentCircuit(
+            fs=args.fs, r1=args.r1, q=args.q, c0=args.c0),
+        profile=DeviceProfile(
+            latency=args.latency / 1000,
+            jitter=args.jitter / 1000,
+            drop=args.drop,
+            split=args.split,
+            noise=args.noise,
+        ),
+        seed=args.seed,
+    )
+    transport = PtyTransport(device)
+    transport.start()
+    if args.bench:
+        bench(transport, args.bench, args.window)
+        return
+    print(f'Имитатор стенда запущен: {transport.port_name}')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        transport.stop()
+
+
+if __name__ == '__main__':
+    main()
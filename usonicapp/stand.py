@@ -0,0 +1,144 @@
+"""Сеанс работы с одним стендом: менеджер COM-порта в отдельном потоке,
+рабочая вкладка и состояние текущего измерения."""
+from freqplan import FrequencyPlan
+from plottab import PlotTab
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+from serialport import MeasuredValues, SerialPortManager, SweepMetrics
+
+
+class StandSession(QObject):
+    """Стенд, подключенный к отдельному COM-порту.
+
+    Сигналы менеджера COM-порта передаются основному окну вместе с
+    объектом сеанса, чтобы одновременно работающие стенды различались.
+    Графики и БД у сеансов общие: перерисовывается только видимая
+    вкладка, а записи всех стендов сохраняются через один
+    DataBaseControl в потоке интерфейса, по одной за раз.
+    """
+    signal_port_checked = pyqtSignal(QObject, bool)
+    signal_transfer_finished = pyqtSignal(QObject)
+    signal_transfer_stopped = pyqtSignal(QObject)
+    signal_progress_change = pyqtSignal(QObject, int)
+    signal_raw_data = pyqtSignal(QObject, bytes)
+    signal_metrics_change = pyqtSignal(QObject, object)
+    start_data_transfer_signal = pyqtSignal(object)
+    stop_data_transfer_signal = pyqtSignal()
+
+    def __init__(self, port_name: str = None, parent=None) -> None:
+        super().__init__(parent)
+        self.serial_manager: SerialPortManager = SerialPortManager(port_name)
+        self.connected: bool = False
+        self.transfer_status: bool = False
+        # Остановка запрошена, но менеджер еще не передал последние точки
+        self.stopping: bool = False
+        self.plottab: PlotTab = None
+        self.progress_maximum: int = 0
+        self.progress_value: int = 0
+        # Шаг и сборка, выбранные при запуске измерения
+        self.step = None
+        self.composition: str = ''
+        # Этап адаптивного измерения: None, 'coarse' или 'fine'
+        self.adaptive_stage = None
+        self.adaptive_coarse: MeasuredValues = None
+        self.adaptive_windows: list = []
+        # Показатели скорости сбора данных по проходам рабочей вкладки
+        self.metrics: list = []
+
+        # Имя thread занято методом QObject.thread()
+        thread = QThread(parent=self)
+        self.acquisition_thread: QThread = thread
+        self.serial_manager.moveToThread(thread)
+        thread.started.connect(self.serial_manager.init_timers)
+        # Файл журнала закрывается в потоке сбора данных при его остановке
+        thread.finished.connect(self.serial_manager.journal.close)
+        thread.finished.connect(self.serial_manager.deleteLater)
+        self.init_signals()
+
+    def init_signals(self) -> None:
+        """Подключаем сигналы менеджера COM-порта."""
+        manager = self.serial_manager
+        manager.signal_port_checked.connect(self.port_checked)
+        manager.signal_stop_data_transfer.connect(self.transfer_finished)
+        manager.signal_transfer_stopped.connect(self.transfer_stopped)
+        manager.signal_transfer_progress_change.connect(
+            self.progress_changed)
+        manager.signal_raw_data.connect(self.raw_data)
+        manager.signal_metrics.connect(self.metrics_changed)
+        self.start_data_transfer_signal.connect(manager.start_data_transfer)
+        self.stop_data_transfer_signal.connect(manager.stop_data_transfer)
+
+    @property
+    def port_name(self) -> str:
+        return self.serial_manager.current_port_name()
+
+    def start(self) -> None:
+        """Запуск потока сбора данных."""
+        self.acquisition_thread.start()
+
+    def quit(self) -> None:
+        """Остановка потока сбора данных."""
+        self.acquisition_thread.quit()
+        self.acquisition_thread.wait()
+
+    def set_plottab(self, plottab: PlotTab) -> None:
+        """Назначает рабочую вкладку, в которую поступают данные стенда.
+        Предыдущая вкладка от стенда отключается."""
+        if self.plottab is not None:
+            self.serial_manager.signal_send_data.disconnect(
+                self.plottab.get_data)
+        self.plottab = plottab
+        self.metrics = []
+        self.serial_manager.signal_send_data.connect(plottab.get_data)
+
+    def start_transfer(self, plan: FrequencyPlan) -> None:
+        """Начало прохода по частотам. План передается в поток сбора
+        данных и дальше изменяется только там."""
+        self.transfer_status = True
+        self.progress_maximum = len(plan)
+        self.progress_value = 0
+        self.start_data_transfer_signal.emit(plan)
+
+    def stop_transfer(self) -> None:
+        """Остановка прохода по частотам."""
+        self.transfer_status = False
+        self.stopping = True
+        self.stop_data_transfer_signal.emit()
+
+    @pyqtSlot(bool)
+    def port_checked(self, status: bool) -> None:
+        self.connected = status
+        self.signal_port_checked.emit(self, status)
+
+    @pyqtSlot()
+    def transfer_finished(self) -> None:
+        self.signal_transfer_finished.emit(self)
+
+    @pyqtSlot()
+    def transfer_stopped(self) -> None:
+        """Менеджер остановил передачу по запросу stop_transfer.
+        Остановки между проходами адаптивного измерения и при потере
+        связи не передаются."""
+        if not self.stopping:
+            return
+        self.stopping = False
+        self.signal_transfer_stopped.emit(self)
+
+    @pyqtSlot(int)
+    def progress_changed(self, value: int) -> None:
+        """Пересчет числа оставшихся точек в число полученных."""
+        self.progress_value = self.progress_maximum - value
+        self.signal_progress_change.emit(self, self.progress_value)
+
+    @pyqtSlot(bytes)
+    def raw_data(self, data: bytes) -> None:
+        self.signal_raw_data.emit(self, data)
+
+    @pyqtSlot(SweepMetrics)
+    def metrics_changed(self, metrics: SweepMetrics) -> None:
+        """Обновляет показатели текущего прохода. Каждый проход
+        адаптивного измерения учитывается отдельно."""
+        if self.metrics and self.metrics[-1].started_at == metrics.started_at:
+            self.metrics[-1] = metrics
+        else:
+            self.metrics.append(metrics)
+        self.signal_metrics_change.emit(self, metrics)
@@ -0,0 +1,170 @@
+"""Сравнение векторного расчета calc_stat с расчетом в Decimal
+(calc_stat_exact.py) и точность уточнения частот и Q между точками.
+
+Кроме имитации стенда сравниваются измерения из журналов сырых данных,
+если задан шаблон их путей:
+    PARITY_JOURNALS="journal/*.usj" python -m pytest tests
+"""
+import glob
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from calc_stat import FITS, SweepWindow, calc_q_t, calc_stat
+from converter import convert_codes, parse_codes, round_values
+from journal import read_journal
+from serialport import MeasuredValues
+from simulator import DeviceProfile, EquivalentCircuit, SimulatedDevice
+
+# Относительное расхождение с расчетом в Decimal, допустимое при сравнении
+PARITY_TOLERANCE = 1e-9
+# Шаблоны путей журналов через os.pathsep
+JOURNALS = os.environ.get('PARITY_JOURNALS', '')
+# Параметры имитации: seed, шум, начальная частота, число точек, шаг
+SIMULATIONS = (
+    (0, 0.0, 21000, 3000, 1),
+    (1, 0.002, 21000, 3000, 1),
+    (2, 0.01, 21500, 1000, 0.5),
+    (3, 0.05, 20000, 600, 10),
+    (4, 0.002, 22300, 200, 1),
+)
+# Эквивалентные схемы имитатора. Емкость C0 второй схемы отличается от
+# C0, принятой в calc_stat, поэтому способ circuit уточняет ее хуже
+CIRCUITS = {
+    'c0': EquivalentCircuit(),
+    'other': EquivalentCircuit(fs=21500, r1=45, q=250, c0=22e-9),
+}
+# Наибольшее отклонение F_zmin (Гц) и Q от эквивалентной схемы при шаге
+# измерения и способе уточнения fit
+FIT_LIMITS = {
+    ('c0', 1, None): (2, 5),
+    ('c0', 1, 'parabola'): (1.5, 3),
+    ('c0', 1, 'circuit'): (0.1, 1),
+    ('c0', 10, None): (6, 20),
+    ('c0', 10, 'parabola'): (1, 8),
+    ('c0', 10, 'circuit'): (0.1, 1),
+    ('other', 1, None): (2, 3),
+    ('other', 1, 'parabola'): (1, 3),
+    ('other', 1, 'circuit'): (2.5, 3),
+    ('other', 10, None): (6, 8),
+    ('other', 10, 'parabola'): (1, 3),
+    ('other', 10, 'circuit'): (2.5, 3),
+}
+# Измерение из журнала прореживается в DECIMATION раз. Допустимое
+# отклонение F_zmin (Гц) и относительное отклонение Q от уточненных
+# значений по всем точкам
+DECIMATION = 10
+JOURNAL_FIT_LIMITS = (2, 0.05)
+
+
+def simulated_sweep(device, freqs: np.ndarray):
+    """Измерение имитатора стенда device на частотах freqs."""
+    payloads = b''.join(device.encode_codes(f) for f in freqs.tolist())
+    return MeasuredValues.from_arrays(round_values(
+        convert_codes(parse_codes(payloads), 1, freqs)))
+
+
+def journal_sweeps() -> list:
+    """Измерения из журналов сырых данных JOURNALS."""
+    sweeps = []
+    for pattern in filter(None, JOURNALS.split(os.pathsep)):
+        for path in sorted(glob.glob(pattern)):
+            for sweep in read_journal(path):
+                if len(sweep.freqs):
+                    freqs = sweep.freqs / 100
+                    sweeps.append(pytest.param(
+                        MeasuredValues.from_arrays(round_values(
+                            convert_codes(
+                                sweep.codes, sweep.calibration, freqs))),
+                        id=f'{os.path.basename(path)}-{sweep.date:%H%M%S}',
+                    ))
+    return sweeps
+
+
+def compare_stat(data, start=None, end=None) -> list:
+    """Расхождения векторного расчета с расчетом в Decimal."""
+    fast = calc_stat(data, start, end)
+    exact = calc_stat(data, start, end, exact=True)
+    if fast is None or exact is None:
+        return [] if fast == exact else [('stat', exact, fast)]
+    errors = []
+    for key, value in exact.items():
+        if isinstance(value, int):
+            if fast[key] != value:
+                errors.append((key, value, fast[key]))
+        elif abs(fast[key] - value) > PARITY_TOLERANCE * max(1, abs(value)):
+            errors.append((key, value, fast[key]))
+    return errors
+
+
+def assert_parity(data) -> None:
+    """Совпадение расчетов на всем измерении и на его участках."""
+    size = len(data)
+    windows = (
+        (None, None), (size // 4, 3 * size // 4),
+        (0, size // 3), (size // 3, size // 2), (-size // 5, None))
+    for start, end in windows:
+        assert compare_stat(data, start, end) == [], (start, end)
+
+
+@pytest.mark.parametrize(
+    'seed, noise, start, count, step', SIMULATIONS,
+    ids=[f'seed={item[0]}' for item in SIMULATIONS])
+def test_parity_simulated(seed, noise, start, count, step):
+    device = SimulatedDevice(profile=DeviceProfile(noise=noise), seed=seed)
+    freqs = start + step * np.arange(count, dtype=np.float64)
+    assert_parity(simulated_sweep(device, freqs))
+
+
+@pytest.mark.skipif(not JOURNALS, reason='PARITY_JOURNALS не задан')
+@pytest.mark.parametrize('data', journal_sweeps())
+def test_parity_journal(data):
+    assert_parity(data)
+
+
+@pytest.fixture(scope='module', params=CIRCUITS)
+def circuit(request):
+    """Частота минимума Z и Q эквивалентной схемы имитатора."""
+    circuit = CIRCUITS[request.param]
+    freqs = np.arange(circuit.fs - 300, circuit.fs + 300, 0.01)
+    z = np.array([circuit.impedance(f) for f in freqs.tolist()])
+    model = SweepWindow(SimpleNamespace(
+        f=freqs, z=np.abs(z), r=z.real, x=z.imag, i=1 / np.abs(z)))
+    return request.param, freqs[model.extrema['z_min']], calc_q_t(model)
+
+
+@pytest.mark.parametrize('step', (1, 10))
+@pytest.mark.parametrize('fit', (None,) + FITS)
+def test_fit_accuracy(circuit, step, fit):
+    """Начальная частота измерения сдвигается на доли шага."""
+    name, F, Q = circuit
+    device = SimulatedDevice(circuit=CIRCUITS[name], seed=0)
+    shifts = 10
+    F_limit, Q_limit = FIT_LIMITS[name, step, fit]
+    for shift in range(shifts):
+        freqs = CIRCUITS[name].fs - 1000 + step * (
+            shift / shifts + np.arange(3000 // step, dtype=np.float64))
+        stat = calc_stat(simulated_sweep(device, freqs), fit=fit)
+        assert abs(stat['F_zmin'] - F) < F_limit
+        assert abs(stat['Q'] - Q) < Q_limit
+
+
+@pytest.mark.skipif(not JOURNALS, reason='PARITY_JOURNALS не задан')
+@pytest.mark.parametrize('data', journal_sweeps())
+@pytest.mark.parametrize('fit', FITS)
+def test_fit_journal(data, fit):
+    """Уточнение по прореженному реальному измерению сходится с
+    уточнением по всем его точкам."""
+    reference = calc_stat(data, fit=fit)
+    if reference is None or len(data) < 10 * DECIMATION:
+        pytest.skip('Измерение без резонанса')
+    F_limit, Q_limit = JOURNAL_FIT_LIMITS
+    for shift in range(DECIMATION):
+        sparse = MeasuredValues(**{
+            key: getattr(data, key)[shift::DECIMATION]
+            for key in MeasuredValues.COLUMNS
+        })
+        stat = calc_stat(sparse, fit=fit)
+        assert abs(stat['F_zmin'] - reference['F_zmin']) < F_limit
+        assert abs(stat['Q'] - reference['Q']) < Q_limit * reference['Q']
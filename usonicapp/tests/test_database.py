@@ -0,0 +1,26 @@
+"""Дополнение таблиц БД полями, появившимися в новых версиях."""
+from database import DataBaseControl
+from models import FactoryNumber, Record
+from peewee import SqliteDatabase
+
+# Поля Record, которых нет в таблицах прежних версий программы
+NEW_COLUMNS = ('raw_data', 'metrics', 'preview', 'z_max', 'f_zmin')
+
+
+def test_models_migrated_separately(tmp_path):
+    db = SqliteDatabase(str(tmp_path / 'usonicApp.db'))
+    db.bind([Record, FactoryNumber])
+    db.connect()
+    db.create_tables([Record, FactoryNumber])
+    for column in NEW_COLUMNS:
+        db.execute_sql(f'DROP INDEX IF EXISTS record_{column}')
+        db.execute_sql(f'ALTER TABLE record DROP COLUMN {column}')
+    db.close()
+
+    control = DataBaseControl()
+    assert control.connect_and_bind_models(db, [FactoryNumber])
+    db.close()
+    assert control.connect_and_bind_models(db, [Record])
+    columns = {column.name for column in db.get_columns('record')}
+    db.close()
+    assert set(NEW_COLUMNS) <= columns
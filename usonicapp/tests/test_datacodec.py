@@ -0,0 +1,98 @@
+"""Совместимость данных Record.data с прежними версиями программы."""
+import struct
+from dataclasses import asdict, dataclass, field
+from decimal import Decimal
+
+import numpy as np
+import pytest
+import simplejson as json
+from config import settings
+from datacodec import decode_values, encode_record_data, encode_values
+from serialport import MeasuredValues, RawMeasuredValue, SerialPortManager
+from simulator import DeviceProfile, SimulatedDevice
+
+
+@dataclass
+class BaselineMeasuredValues:
+    """MeasuredValues прежних версий, которые читают общую БД."""
+    f: list = field(default_factory=list)
+    z: list = field(default_factory=list)
+    r: list = field(default_factory=list)
+    x: list = field(default_factory=list)
+    ph: list = field(default_factory=list)
+    i: list = field(default_factory=list)
+    u: list = field(default_factory=list)
+
+    def add_value(self, value) -> None:
+        for key in ('f', 'z', 'r', 'x', 'ph', 'i', 'u'):
+            getattr(self, key).append(getattr(value, key))
+
+
+@pytest.fixture
+def measured():
+    """Одни и те же точки имитатора в прежнем и новом наборе значений."""
+    device = SimulatedDevice(profile=DeviceProfile(noise=0.01), seed=1)
+    baseline = BaselineMeasuredValues()
+    values = MeasuredValues()
+    for freq in range(21900, 22100):
+        codes = struct.unpack('<6H', device.encode_codes(freq))
+        value = SerialPortManager.calc_data(
+            RawMeasuredValue(*(Decimal(code) for code in codes)),
+            Decimal('1.000'), freq)
+        baseline.add_value(value)
+        values.add_value(value)
+    return baseline, values
+
+
+@pytest.fixture
+def json_records(monkeypatch):
+    monkeypatch.setattr(settings, 'BINARY_RECORD_DATA', False)
+
+
+def with_std(values: MeasuredValues) -> MeasuredValues:
+    """Те же точки с отклонением Z, как при усреднении замеров."""
+    columns = values.columns()
+    columns['z_std'] = np.round(values.z / 100, 2)
+    return MeasuredValues(**columns)
+
+
+def encode_json(values: MeasuredValues) -> bytes:
+    return json.dumps(values.to_dict(), use_decimal=True).encode('utf-8')
+
+
+def assert_same(decoded, values: MeasuredValues) -> None:
+    assert len(decoded) == len(values)
+    for key in MeasuredValues.COLUMNS + ('z_std',):
+        assert np.array_equal(getattr(decoded, key), getattr(values, key))
+
+
+def test_json_readable_by_baseline(json_records, measured):
+    baseline, values = measured
+    blob = encode_record_data(values)
+    assert blob == json.dumps(asdict(baseline), use_decimal=True).encode()
+    decoded = BaselineMeasuredValues(**json.loads(blob, use_decimal=True))
+    assert decoded == baseline
+
+
+@pytest.mark.parametrize('wrap', (bytes, memoryview))
+def test_decode_baseline_json(measured, wrap):
+    baseline, values = measured
+    blob = json.dumps(asdict(baseline), use_decimal=True).encode('utf-8')
+    decoded = decode_values(wrap(blob))
+    assert not decoded.has_std
+    assert_same(decoded, values)
+
+
+@pytest.mark.parametrize('std', (False, True), ids=('plain', 'z_std'))
+@pytest.mark.parametrize('encode', (
+    encode_json,
+    encode_values,
+    lambda values: encode_values(values, compress=False),
+), ids=('json', 'binary', 'binary-raw'))
+def test_round_trip(measured, encode, std):
+    values = measured[1]
+    if std:
+        values = with_std(values)
+    decoded = decode_values(memoryview(encode(values)))
+    assert decoded.has_std == std
+    assert_same(decoded, values)
@@ -0,0 +1,56 @@
+"""Потоковый разбор посылок COM-порта."""
+import constants as cts
+from serialport import FrameDecoder
+
+PAYLOAD = bytes(range(1, 13))
+DATA_FRAME = cts.DATA + PAYLOAD
+VOLTAGE_FRAME = cts.VOLTAGE + b'\x64\x00'
+
+
+def test_frame_split_across_reads():
+    decoder = FrameDecoder()
+    frames = []
+    for byte in DATA_FRAME:
+        frames += decoder.feed(bytes([byte]))
+    assert frames == [(cts.DATA, PAYLOAD)]
+    assert not decoder.buffer
+
+
+def test_incomplete_tail_waits_for_next_read():
+    decoder = FrameDecoder()
+    assert decoder.feed(VOLTAGE_FRAME + DATA_FRAME[:5]) == [
+        (cts.VOLTAGE, b'\x64\x00')]
+    assert bytes(decoder.buffer) == DATA_FRAME[:5]
+    assert decoder.feed(DATA_FRAME[5:]) == [(cts.DATA, PAYLOAD)]
+
+
+def test_several_frames_in_one_read():
+    decoder = FrameDecoder()
+    data = (VOLTAGE_FRAME + DATA_FRAME + DATA_FRAME
+            + cts.CALIBRATION + b'\xe8\x03')
+    assert decoder.feed(data) == [
+        (cts.VOLTAGE, b'\x64\x00'),
+        (cts.DATA, PAYLOAD),
+        (cts.DATA, PAYLOAD),
+        (cts.CALIBRATION, b'\xe8\x03'),
+    ]
+    assert not decoder.buffer
+
+
+def test_leading_garbage_skipped():
+    decoder = FrameDecoder()
+    assert decoder.feed(b'\x00\x13\x37' + DATA_FRAME) == [(cts.DATA, PAYLOAD)]
+
+
+def test_resync_after_garbage_between_frames():
+    decoder = FrameDecoder()
+    frames = decoder.feed(DATA_FRAME + b'\x01\x02')
+    frames += decoder.feed(b'\x03' + VOLTAGE_FRAME)
+    assert frames == [(cts.DATA, PAYLOAD), (cts.VOLTAGE, b'\x64\x00')]
+
+
+def test_clear_drops_partial_frame():
+    decoder = FrameDecoder()
+    decoder.feed(DATA_FRAME[:7])
+    decoder.clear()
+    assert decoder.feed(VOLTAGE_FRAME) == [(cts.VOLTAGE, b'\x64\x00')]
@@ -0,0 +1,76 @@
+"""Запись сырых посылок в файл журнала и в буфер измерения."""
+import journal
+from journal import (KIND_POINT, RECORD, RawFrameJournal, decode_sweeps,
+                     encode_sweep_header, read_journal)
+
+PAYLOAD = bytes(range(12))
+
+
+def record_sweep(raw: RawFrameJournal) -> bytes:
+    raw.start_sweep(1000, 200)
+    raw.add_point(2200000, PAYLOAD)
+    return raw.finish_sweep()
+
+
+def test_disabled_journal_keeps_nothing(tmp_path):
+    raw = RawFrameJournal(path=str(tmp_path / 'raw.usj'))
+    raw.start(write=False, keep=False)
+    assert record_sweep(raw) == b''
+    assert not list(tmp_path.iterdir())
+
+
+def test_buffer_without_file(tmp_path):
+    raw = RawFrameJournal(path=str(tmp_path / 'raw.usj'))
+    raw.start(write=False, keep=True)
+    sweeps = decode_sweeps(record_sweep(raw))
+    assert len(sweeps) == 1
+    assert sweeps[0].freqs.tolist() == [2200000]
+    assert not list(tmp_path.iterdir())
+
+
+def test_file_without_buffer(tmp_path):
+    path = tmp_path / 'raw.usj'
+    raw = RawFrameJournal(path=str(path))
+    raw.start(write=True, keep=False)
+    assert record_sweep(raw) == b''
+    raw.close()
+    assert raw.file is None
+    assert len(read_journal(str(path))) == 1
+
+
+def test_new_file_after_midnight(tmp_path, monkeypatch):
+    day = ['2026-01-01']
+    monkeypatch.setattr(
+        RawFrameJournal, 'default_path',
+        staticmethod(lambda suffix=None: str(tmp_path / f'{day[0]}.usj')))
+    raw = RawFrameJournal()
+    raw.start(write=True, keep=False)
+    record_sweep(raw)
+    day[0] = '2026-01-02'
+    record_sweep(raw)
+    raw.close()
+    assert len(read_journal(str(tmp_path / '2026-01-01.usj'))) == 1
+    assert len(read_journal(str(tmp_path / '2026-01-02.usj'))) == 1
+
+
+def test_offsets_of_long_sweep(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(journal.time, 'monotonic', lambda: clock[0])
+    raw = RawFrameJournal()
+    raw.start(write=False, keep=True)
+    raw.start_sweep(1000, 200)
+    clock[0] += 5 * 3600
+    raw.add_point(2200000, PAYLOAD)
+    # Смещение ограничено снизу нулем, сверху - OFFSET_MAX мс
+    clock[0] = 900.0
+    raw.add_point(2200100, PAYLOAD)
+    clock[0] = 1000.0 + 100 * 86400
+    raw.add_point(2200200, PAYLOAD)
+    offsets = decode_sweeps(raw.finish_sweep())[0].offsets.tolist()
+    assert offsets == [5 * 3600 * 10 ** 6, 0, 0xFFFFFFFF * 1000]
+
+
+def test_offsets_in_previous_format():
+    data = encode_sweep_header(1000, 200, 0.0) + RECORD.pack(
+        KIND_POINT, 0, 0, 2200000, 1500, PAYLOAD)
+    assert decode_sweeps(data)[0].offsets.tolist() == [1500]
@@ -2,32 +2,35 @@
 
 import os
 import sys
-from dataclasses import asdict
 from datetime import datetime
 from decimal import Decimal
 from math import ceil
 from typing import Dict, List, Union
 
 import constants as cts
-import numpy as np
 import qdarktheme
 import simplejson as json
+from adaptive import find_resonance_windows, merge_values, refine_plan
+from archive import ArchivedValues, SweepArchive
 from calc_stat import calc_stat
 from config import settings
 from database import DataBaseCheck, DataBaseControl
+from datacodec import decode_values, encode_preview, encode_record_data
 from dynaconf import loaders
 from dynaconf.utils.boxing import DynaBox
+from freqplan import FrequencyPlan
 from models import Record
 from peewee import PostgresqlDatabase, SqliteDatabase
 from plottab import ComparePlotTab, PlotTab, PlotUpdateWorker
 from PyQt5 import uic
-from PyQt5.QtCore import (QDate, QModelIndex, QSize, Qt, QThread, QTimer,
-                          pyqtSignal, pyqtSlot)
+from PyQt5.QtCore import (QDate, QModelIndex, QObject, QSize, Qt, QThread,
+                          QTimer, pyqtSignal, pyqtSlot)
 from PyQt5.QtGui import QColor, QIcon, QPixmap
 from PyQt5.QtWidgets import (QApplication, QCheckBox, QHeaderView, QLabel,
                              QMainWindow, QTableWidget, QTableWidgetItem,
                              QWidget)
 from serialport import MeasuredValues, SerialPortManager
+from stand import StandSession
 from widgets import CellCheckbox, EditToolButton
 
 basedir = os.path.dirname(__file__)
@@ -449,10 +452,11 @@ class PasswordWindow(QWidget):
 class CompareModedWindow(QWidget):
     """Окно выбора режима сравнения записей."""
 
-    def __init__(self, records, tabwidget, *args, **kwargs) -> None:
+    def __init__(self, records, tabwidget, load_data=None, *args, **kwargs) -> None:  # noqa
         super().__init__(*args, **kwargs)
         self.records = records
         self.tabwidget = tabwidget
+        self.load_data = load_data
         self.init_gui()
         self.accept_button.clicked.connect(self.accept_button_clicked)
         self.cancel_button.clicked.connect(self.cancel_button_clicked)
@@ -478,6 +482,7 @@ class CompareModedWindow(QWidget):
             tabwidget=self.tabwidget,
             records=self.records,
             mode=mode,
+            load_data=self.load_data,
         )
         params = ', '.join(mode)
         tab_title = f'Сравнение по параметрам: {params}'
@@ -494,6 +499,7 @@ class CompareModedWindow(QWidget):
 class TableWindow(QWidget):
     terminal_signal: pyqtSignal = pyqtSignal(str)
     donwload_records_signal: pyqtSignal = pyqtSignal(list)
+    compare_records_signal: pyqtSignal = pyqtSignal(list, object)
 
     """Таблица базы данных программы."""
     def __init__(self, db: DataBaseControl) -> None:
@@ -522,6 +528,7 @@ class TableWindow(QWidget):
         self.tabwidget.setTabIcon(1, set_icon('icons/local_server.png'))
         self.tabwidget.setIconSize(QSize(20, 20))
         self.open_button.setIcon(set_icon('icons/load.png'))
+        self.compare_button.setIcon(set_icon('icons/compare.png'))
         self.update_button.setIcon(set_icon('icons/update.png'))
         self.groupedit_button.setIcon(set_icon('icons/group_edit.png'))
         self.filter_button.setIcon(set_icon('icons/filter.png'))
@@ -544,6 +551,7 @@ class TableWindow(QWidget):
     def init_signals(self) -> None:
         """Подключаем сигналы к слотам."""
         self.open_button.clicked.connect(self.download_button_clicked)
+        self.compare_button.clicked.connect(self.compare_button_clicked)
         self.delete_button.clicked.connect(self.delete_button_clicked)
         self.sync_button.clicked.connect(self.sync_button_clicked)
         self.update_button.clicked.connect(self.update_button_clicked)
@@ -849,6 +857,22 @@ class TableWindow(QWidget):
         self.donwload_records_signal.emit(records)
         self.hide()
 
+    @pyqtSlot()
+    def compare_button_clicked(self) -> None:
+        """Слот нажатия кнопки сравнения. Записи выгружаются с эскизами,
+        полные данные загружаются при увеличении масштаба графика."""
+        table_name: str = self.get_current_table_name()
+        db = self.get_db_by_name(table_name)
+        selected_id = self.selected_records.get(table_name)
+        if not selected_id or not 2 <= len(selected_id) <= 10:
+            self.terminal_signal.emit(
+                'Для сравнения необходимо от 2 до 10 записей.')
+            return
+        records = self.db.get_previews(db, selected_id)
+        self.compare_records_signal.emit(
+            records, lambda record: self.db.get_record_data(db, record.id))
+        self.hide()
+
     def check_selected_records(self) -> bool:
         """Проверка - есть ли выделенные записи в текущей таблице"""
         if self.get_current_selected_records():
@@ -1070,7 +1094,11 @@ class MainWindow(QMainWindow):
         uic.loadUi(os.path.join(basedir, 'forms/mainwindow.ui'), self)
         self.temporary: bool = False
         self.db: DataBaseControl = DataBaseControl()
-        self.serial_manager: SerialPortManager = SerialPortManager()
+        self.archive: SweepArchive = SweepArchive()
+        self.archive.cleanup(settings.ARCHIVE_DAYS)
+        # Стенды и стенд, которым управляют виджеты основного окна
+        self.sessions: List[StandSession] = []
+        self.session: StandSession = None
         self.storage: dict = {}
 
         self.init_gui()
@@ -1079,8 +1107,6 @@ class MainWindow(QMainWindow):
         self.init_threads()
         self.init_signals()
 
-        self.serial_manager.init_timers()
-
     def init_gui(self) -> None:
         """Настройка графического интерфейса."""
         self.centralwidget.setContentsMargins(6, 6, 6, 6)
@@ -1104,6 +1130,7 @@ class MainWindow(QMainWindow):
             settings.OPERATOR)
 
         self.real_time_chekbox.setChecked(settings.REAL_TIME_CHART)
+        self.adaptive_checkbox.setChecked(settings.ADAPTIVE_SWEEP)
 
         self.fnumber_lineedit.setText(
             settings.PREVIOUS_FACTORY_NUMBER
@@ -1147,6 +1174,11 @@ class MainWindow(QMainWindow):
         self.plot_update_timer: QTimer = QTimer()
         interval: int = int(1000 / settings.FPS)
         self.plot_update_timer.setInterval(interval)
+        self.plot_update_timer.timeout.connect(self.draw_current_tab)
+
+        self.stand_discovery_timer: QTimer = QTimer()
+        self.stand_discovery_timer.setInterval(cts.TIMER_CHECK_SERIAL_PORT)
+        self.stand_discovery_timer.timeout.connect(self.discover_stands)
 
     def init_threads(self) -> None:
         """Инициализация потоков."""
@@ -1164,6 +1196,58 @@ class MainWindow(QMainWindow):
         self.check_db_status_thread.start()
         self.check_db_status_worker.init_timers()
 
+        # Сбор данных с COM-порта не зависит от отрисовки графиков
+        self.init_stands()
+
+    def init_stands(self) -> None:
+        """Создает сеанс основного стенда, работающего с портом из
+        настроек. В многостендовом режиме сеансы добавляются для всех
+        появляющихся COM-портов, всего не более MAX_STANDS."""
+        self.session = self.add_stand()
+        if settings.MULTI_STAND:
+            self.discover_stands()
+            self.stand_discovery_timer.start()
+        else:
+            self.stand_label.setVisible(False)
+            self.stand_combobox.setVisible(False)
+
+    def add_stand(self, port_name: str = None) -> StandSession:
+        """Создает сеанс стенда со своим потоком сбора данных."""
+        session = StandSession(port_name, parent=self)
+        session.signal_port_checked.connect(self.stand_port_checked)
+        session.signal_transfer_finished.connect(self.data_transfer_finished)
+        session.signal_transfer_stopped.connect(self.transfer_stopped)
+        session.signal_progress_change.connect(self.update_progress_bar)
+        session.signal_progress_change.connect(self.update_live_stat)
+        session.signal_raw_data.connect(self.set_raw_data)
+        session.signal_metrics_change.connect(self.update_metrics)
+        self.sessions.append(session)
+        self.stand_combobox.addItem(
+            QIcon(self.disconnect_pixmap), session.port_name)
+        session.start()
+        return session
+
+    @pyqtSlot()
+    def discover_stands(self) -> None:
+        """Добавляет сеансы для появившихся COM-портов. Пропавшие порты
+        остаются в списке: их сеансы проверят связь при повторном
+        появлении порта. Порт из COM_PORT всегда остается за основным
+        стендом."""
+        # COM_PORT может быть задан полным путем устройства, а в списке
+        # портов указываются только имена
+        known = {
+            os.path.basename(name) for name in
+            [settings.COM_PORT] + [item.port_name for item in self.sessions]
+        }
+        for port in SerialPortManager.get_available_port_names():
+            if len(self.sessions) >= settings.MAX_STANDS:
+                break
+            if os.path.basename(port) not in known:
+                known.add(os.path.basename(port))
+                self.add_stand(port)
+        self.stand_label.setVisible(len(self.sessions) > 1)
+        self.stand_combobox.setVisible(len(self.sessions) > 1)
+
     def init_signals(self) -> None:
         """Подключаем сигналы к слотам."""
         # Попробовать перенести инициализацию сигналов в соответствующие классы
@@ -1184,6 +1268,9 @@ class MainWindow(QMainWindow):
         self.real_time_chekbox.stateChanged.connect(
             self.real_time_checkbox_changed
         )
+        self.adaptive_checkbox.stateChanged.connect(
+            self.adaptive_checkbox_changed
+        )
         self.temporary_data_checkbox.stateChanged.connect(
             self.temporary_data_checkbox_changed
         )
@@ -1197,16 +1284,14 @@ class MainWindow(QMainWindow):
         self.table_window.terminal_signal.connect(self.terminal_msg)
         self.table_window.donwload_records_signal.connect(
             self.download_records)
+        self.table_window.compare_records_signal.connect(
+            self.compare_records)
         # Окно редактирования записи
         self.table_window.edit_record_window.terminal_signal.connect(
             self.terminal_msg)
-        # COM-порт
-        self.serial_manager.signal_port_checked.connect(
-            self.update_serial_port_interface)
-        self.serial_manager.signal_stop_data_transfer.connect(
-            self.startstop_button_clicked)
-        self.serial_manager.signal_transfer_progress_change.connect(
-            self.update_progress_bar)
+        # Стенды
+        self.stand_combobox.currentIndexChanged.connect(
+            self.stand_combobox_changed)
 
         # Обновление диапазона в интерфейсе
         self.update_range_signal.connect(self.update_range)
@@ -1235,15 +1320,22 @@ class MainWindow(QMainWindow):
         else:
             settings.REAL_TIME_CHART = False
 
+    @pyqtSlot(int)
+    def adaptive_checkbox_changed(self, state):
+        """Изменение чекбокса адаптивного режима приводит к изменению
+        настроек"""
+        settings.ADAPTIVE_SWEEP = state == 2
+
     @pyqtSlot(list)
     def download_records(self, records) -> None:
         """Выгружает записи из БД, создает вкладки и строит графики."""
         for record in records:
             date_str = record.date.strftime('%H:%M:%S')
             title = f'{date_str} - {record.factory_number}'
-            self.plottab = PlotTab(
+            plottab = PlotTab(
                 tabwidget=self.tabwidget,
                 record=record,
+                update_range_signal=self.update_range_signal,
             )
             # Если выгружаемая запись не пуста
             if record.data is None:
@@ -1251,29 +1343,21 @@ class MainWindow(QMainWindow):
                     f'Не удалось загрузить запись: {title}. '
                     'Некорректный тип данных.')
                 continue
-            # От локальной и удаленной БД поступают разные типы данных
-            # record.data. Преобразуем при необходимости в Memoryview.
-            if not isinstance(record.data, memoryview):
-                record.data = memoryview(record.data)
-
-            data = MeasuredValues(
-                **json.loads(record.data.tobytes(), use_decimal=True)
-            )
-            self.plottab.set_data(data)
-            self.plot_update_worker.draw(self.plottab)
-            self.tabwidget.addTab(self.plottab.page, title)
+            plottab.set_data(self.archived(decode_values(record.data)))
+            self.plot_update_worker.draw(plottab)
+            self.tabwidget.addTab(plottab.page, title)
             self.tabwidget.setCurrentIndex(self.tabwidget.count() - 1)
-            self.storage[self.plottab.page] = self.plottab
+            self.storage[plottab.page] = plottab
 
             # Выводим основные параметры на экран
-            self.plottab.label_frequency.setText(
+            plottab.label_frequency.setText(
                 f"F = {record.frequency} Гц")
-            self.plottab.label_resistance.setText(
+            plottab.label_resistance.setText(
                 f"R = {record.resistance} Ом")
-            self.plottab.label_quality_factor.setText(
+            plottab.label_quality_factor.setText(
                 f"Q = {record.quality_factor}")
             if record.composition:
-                self.plottab.label_composition.setText(
+                plottab.label_composition.setText(
                     f"Сборка - {record.composition}")
 
     @pyqtSlot(bool)
@@ -1287,23 +1371,20 @@ class MainWindow(QMainWindow):
         self.range_spinbox.setEnabled(status)
         self.step_spinbox.setEnabled(status)
 
-    def get_freq_list(self, express=False) -> list:
-        """Возвращает заданные пользователем данные по частоте."""
+    def get_freq_plan(self, express=False, step=None) -> FrequencyPlan:
+        """Возвращает план частот по заданным пользователем данным. Параметр
+        step позволяет задать шаг, отличный от выбранного в интерфейсе."""
         if express is False:
             freq_start: int = self.freq_spinbox.value()
             freq_stop: int = freq_start + self.range_spinbox.value()
-            step: Decimal = round(Decimal(self.step_spinbox.value()), 2)
+            if step is None:
+                step = self.step_spinbox.value()
+            step: Decimal = round(Decimal(step), 2)
         else:
             freq_start: int = int(settings.EXPRESS_RANGE.split('-')[0])
             freq_stop: int = int(settings.EXPRESS_RANGE.split('-')[1])
             step: Decimal = round(Decimal(settings.EXPRESS_STEP), 2)
-        freq_list: list = np.arange(
-            freq_start,
-            freq_stop,
-            step
-        ).tolist()
-        # freq_stop: Decimal = freq_list[-1]
-        return freq_list
+        return FrequencyPlan.uniform(freq_start, freq_stop, step)
 
     @pyqtSlot(int)
     def toggle_upload_button_status(self, index) -> None:
@@ -1334,9 +1415,7 @@ class MainWindow(QMainWindow):
     @pyqtSlot()
     def startstop_button_clicked(self) -> None:
         """Слот нажатия кнопки пуска/остановки приема данных."""
-        transfer_status = self.serial_manager.get_transfer_status()
-        self.serial_manager.toggle_transfer_status()
-        if transfer_status is False:
+        if self.session.transfer_status is False:
             self.start_transfer()
         else:
             self.stop_transfer()
@@ -1346,18 +1425,30 @@ class MainWindow(QMainWindow):
         settings.PREVIOUS_FACTORY_NUMBER = self.fnumber_lineedit.text()
 
     def start_transfer(self, express=False):
-        """Начало передачи данных."""
+        """Начало передачи данных на выбранном стенде."""
+        session = self.session
+        # Запись прежнего измерения еще не заполнена последними точками
+        if session.stopping:
+            return
         self.startstop_button.setIcon(set_icon('icons/stop.png'))
-        freq_list = self.get_freq_list(express)
-        self.progressbar.setMaximum(len(freq_list))
-        self.progressbar.setValue(0)
-        self.toggle_serial_interface(False)
         step = self.step_spinbox.value()
+        session.step = step
+        session.composition = self.composition_combobox.currentText()
+        session.adaptive_stage = None
         if express:
             step = settings.EXPRESS_STEP
-        self.terminal_msg(
-            f'Передача данных в диапазоне {freq_list[0]} - '
-            f'{ceil(freq_list[-1])} с шагом '
+        elif settings.ADAPTIVE_SWEEP:
+            step = max(step, settings.ADAPTIVE_COARSE_STEP)
+            session.adaptive_stage = 'coarse'
+        plan = self.get_freq_plan(express, step)
+        self.progressbar.setMaximum(len(plan))
+        self.progressbar.setValue(0)
+        self.show_metrics()
+        self.toggle_serial_interface(False)
+        self.stand_msg(
+            session,
+            f'Передача данных в диапазоне {plan.first:g} - '
+            f'{ceil(plan.last)} с шагом '
             f'{round(step, 2)}'
         )
 
@@ -1365,58 +1456,120 @@ class MainWindow(QMainWindow):
         device_model = self.devicemodel_combobox.currentText()
         series = self.series_combobox.currentText()
         user = settings.OPERATOR
-        self.create_tab(
+        session.set_plottab(self.create_tab(
             factory_number=factory_number,
             device_model=device_model,
             series=series,
             user=user,
-            )
-        self.serial_manager.start_data_transfer(freq_list)
-
-    def stop_transfer(self):
-        """Остановка передачи данных."""
-        self.startstop_button.setIcon(set_icon('icons/start.png'))
-        self.toggle_serial_interface(True)
-        self.terminal_msg('Передача данных завершена')
-        self.serial_manager.stop_data_transfer()
-        self.plot_update_timer.stop()
-
-        # Если отрисовка в режиме реального времени
-        # отключена, то отрисовываем график при завершении
-        # передачи данных.
-        if settings.REAL_TIME_CHART is False:
-            self.plot_update_worker.draw(self.plottab)
-        # не красиво, попробовать переделать
-        try:
-            self.plot_update_timer.disconnect()
-        except TypeError:
-            pass
+            port_name=session.port_name,
+            ))
+        session.plottab.set_data(self.new_values(len(plan)))
+        # Если отключена функция отрисовки в режиме реального времени, то
+        # не включаем таймер отрисовки графика.
+        if settings.REAL_TIME_CHART is True:
+            self.plot_update_timer.setInterval(int(1000 / settings.FPS))
+            self.plot_update_timer.start()
+        session.start_transfer(plan)
+
+    def stop_transfer(self, session: StandSession = None):
+        """Остановка передачи данных. По умолчанию на выбранном стенде."""
+        session = session or self.session
+        session.stop_transfer()
+        if session is self.session:
+            self.startstop_button.setIcon(set_icon('icons/start.png'))
+            self.toggle_serial_interface(True)
+        self.stand_msg(session, 'Передача данных завершена')
+        if not any(item.transfer_status for item in self.sessions):
+            self.plot_update_timer.stop()
+
+    @pyqtSlot(QObject)
+    def transfer_stopped(self, session: StandSession) -> None:
+        """Итоговый график и запись измерения. Вызывается, когда менеджер
+        COM-порта передал последние точки после остановки."""
+        # Объединяем результаты грубого и точного проходов
+        plottab = session.plottab
+        if session.adaptive_stage == 'fine':
+            plottab.set_data(self.archived(merge_values(
+                session.adaptive_coarse, plottab.data,
+                session.adaptive_windows)))
+        session.adaptive_stage = None
+        session.adaptive_coarse = None
+        if isinstance(plottab.data, ArchivedValues):
+            plottab.data.flush()
+
+        # В режиме реального времени обновляется только открытая вкладка,
+        # поэтому итоговый график отрисовываем при завершении передачи
+        # данных.
+        self.plot_update_worker.draw(plottab)
 
         # Производим расчет параметров и обновляем данные записи
-        index = self.tabwidget.count() - 1
-        page = self.tabwidget.widget(index)
-        plottab = self.storage.get(page)
-        stat = calc_stat(plottab.data)
+        stat = calc_stat(
+            plottab.data, exact=settings.EXACT_CONVERSION,
+            fit=settings.RESONANCE_FIT)
 
-        encode_data = json.dumps(asdict(plottab.data), use_decimal=True)
-        plottab.record.data = (encode_data).encode('utf-8')
+        plottab.record.data = encode_record_data(plottab.data)
+        plottab.record.preview = encode_preview(plottab.data)
         if stat:
-            plottab.record.frequency = stat['F']
-            plottab.record.resistance = stat['R']
-            plottab.record.quality_factor = stat['Q']
-            plottab.record.composition = (
-                self.composition_combobox.currentText())
-            plottab.label_frequency.setText(f"F = {stat['F']} Гц")
-            plottab.label_resistance.setText(f"R = {stat['R']} Ом")
-            plottab.label_quality_factor.setText(f"Q = {stat['Q']}")
+            plottab.record.set_stat(stat)
+            plottab.record.composition = session.composition
+            plottab.show_stat(stat)
             plottab.label_composition.setText(
                 f"Сборка - {plottab.record.composition}")
 
+    @pyqtSlot(QObject)
+    def data_transfer_finished(self, session: StandSession) -> None:
+        """Завершение прохода по частотам на стенде. В адаптивном режиме
+        после грубого прохода запускается точный проход около резонанса."""
+        if not session.transfer_status:
+            return
+        if session.adaptive_stage == 'coarse' and self.start_fine_pass(session):  # noqa
+            return
+        if session is self.session:
+            self.startstop_button_clicked()
+        else:
+            self.stop_transfer(session)
+
+    def start_fine_pass(self, session: StandSession) -> bool:
+        """Запуск точного прохода по окнам, найденным при грубом проходе."""
+        windows = find_resonance_windows(
+            session.plottab.data, settings.ADAPTIVE_MARGIN)
+        plan = refine_plan(windows, session.step)
+        if not len(plan):
+            return False
+        session.adaptive_stage = 'fine'
+        session.adaptive_coarse = session.plottab.data
+        session.adaptive_windows = windows
+        session.plottab.set_data(self.new_values(len(plan)))
+        if session is self.session:
+            self.progressbar.setMaximum(len(plan))
+            self.progressbar.setValue(0)
+        ranges = ', '.join(f'{start} - {stop}' for start, stop in windows)
+        self.stand_msg(
+            session,
+            f'Точный проход в диапазонах {ranges} с шагом '
+            f'{round(session.step, 2)}'
+        )
+        session.stop_data_transfer_signal.emit()
+        session.start_transfer(plan)
+        return True
+
+    def new_values(self, capacity: int) -> MeasuredValues:
+        """Набор значений нового прохода: в файле архива, если включен
+        SWEEP_ARCHIVE, иначе в памяти."""
+        if settings.SWEEP_ARCHIVE:
+            return self.archive.create(capacity)
+        return MeasuredValues(capacity=capacity)
+
+    def archived(self, values: MeasuredValues) -> MeasuredValues:
+        """Готовый набор значений, перенесенный в архив, если включен
+        SWEEP_ARCHIVE."""
+        if settings.SWEEP_ARCHIVE and not isinstance(values, ArchivedValues):
+            return self.archive.store(values)
+        return values
+
     def express_scan(self) -> None:
         """Экспресс сканирование по заданному диапазону и заданным шагом."""
-        transfer_status = self.serial_manager.get_transfer_status()
-        self.serial_manager.toggle_transfer_status()
-        if transfer_status is False:
+        if self.session.transfer_status is False:
             self.start_transfer(express=True)
         else:
             self.stop_transfer()
@@ -1441,10 +1594,10 @@ class MainWindow(QMainWindow):
         self.freq_spinbox.setValue(coordinate[0])
         self.range_spinbox.setValue(coordinate[1])
 
-    def create_tab(self, factory_number: str, series: str, device_model: str, user: str):  # noqa
+    def create_tab(self, factory_number: str, series: str, device_model: str, user: str, port_name: str = None) -> PlotTab:  # noqa
         """Создает новую вкладку QTabwidget и соответствующий объект с
-        графиками. Устанавливает связь между получением данных от
-        COM-порта и методом объекта plottab."""
+        графиками. При нескольких стендах в заголовок вкладки добавляется
+        имя COM-порта."""
         record = Record(
             series=series,
             device_model=device_model,
@@ -1453,29 +1606,33 @@ class MainWindow(QMainWindow):
             temporary=self.temporary,
         )
 
-        self.plottab = PlotTab(
+        plottab = PlotTab(
             tabwidget=self.tabwidget,
             record=record,
             update_range_signal=self.update_range_signal,
         )
 
-        self.serial_manager.signal_send_data.connect(self.plottab.get_data)
-        # Если отключена функция отрисовки в режиме реального времени, то
-        # не включаем таймеры отрисовки графика.
-        if settings.REAL_TIME_CHART is True:
-            self.plot_update_timer.setInterval(int(1000 / settings.FPS))
-            self.plot_update_timer.timeout.connect(lambda: self.plot_update_worker.draw(self.plottab))  # noqa
-            self.plot_update_timer.start()
-
         date_str = record.date.strftime('%H:%M:%S')
         if self.temporary:
             tab_title = f'{date_str} - временная запись'
         else:
             tab_title = f'{date_str} - {factory_number}'
-        self.tabwidget.addTab(self.plottab.page, tab_title)
+        if port_name and len(self.sessions) > 1:
+            tab_title += f' ({port_name})'
+        self.tabwidget.addTab(plottab.page, tab_title)
         self.tabwidget.setCurrentIndex(self.tabwidget.count() - 1)
-        self.storage[self.plottab.page] = self.plottab
+        self.storage[plottab.page] = plottab
         self.check_tab_number()
+        return plottab
+
+    @pyqtSlot()
+    def draw_current_tab(self) -> None:
+        """Отрисовка открытой вкладки, если в нее поступают данные. Число
+        перерисовок в секунду не зависит от количества стендов."""
+        page = self.tabwidget.currentWidget()
+        for session in self.sessions:
+            if session.transfer_status and session.plottab.page == page:
+                self.plot_update_worker.draw(session.plottab)
 
     @pyqtSlot(int)
     def close_tab(self, index: int) -> bool:
@@ -1483,12 +1640,10 @@ class MainWindow(QMainWindow):
         виджету."""
         try:
             page = self.tabwidget.widget(index)
-            # Если закрыли рабочую вкладку, то останавливаем все процессы
-            if self.plottab.page == page:
-                transfer_status = self.serial_manager.get_transfer_status()
-                if transfer_status:
-                    self.serial_manager.toggle_transfer_status()
-                    self.stop_transfer()
+            # Если закрыли рабочую вкладку, то останавливаем измерение
+            for session in self.sessions:
+                if session.transfer_status and session.plottab.page == page:
+                    self.stop_transfer(session)
             self.tabwidget.removeTab(index)
             del self.storage[page]
             self.check_tab_number()
@@ -1501,13 +1656,97 @@ class MainWindow(QMainWindow):
             # )
             return False
 
-    @pyqtSlot(int)
-    def update_progress_bar(self, value):
+    @pyqtSlot(QObject, bytes)
+    def set_raw_data(self, session: StandSession, data: bytes) -> None:
+        """Сохраняет сырые данные завершенного измерения в записи рабочей
+        вкладки стенда, если это включено в настройках."""
+        if settings.SAVE_RAW_DATA:
+            # Адаптивное измерение состоит из нескольких проходов
+            raw_data = session.plottab.record.raw_data or b''
+            session.plottab.record.raw_data = bytes(raw_data) + data
+
+    @pyqtSlot(QObject, int)
+    def update_progress_bar(self, session: StandSession, value: int):
         """Обновляет по срабатыванию сигнала значение
-        виджета progressbar."""
-        maximum = self.progressbar.maximum()
-        value = maximum - value
-        self.progressbar.setValue(value)
+        виджета progressbar для выбранного стенда."""
+        if session is self.session:
+            self.progressbar.setValue(value)
+
+    @pyqtSlot(QObject, int)
+    def update_live_stat(self, session: StandSession, value: int) -> None:
+        """Показывает F, R и Q по уже полученным точкам. Если включен
+        EARLY_STOP, измерение завершается, как только резонанс пройден.
+        Точный проход адаптивного измерения содержит только окна около
+        резонанса, поэтому в нем параметры не выводятся."""
+        if not session.transfer_status or session.adaptive_stage == 'fine':
+            return
+        plottab = session.plottab
+        stat = plottab.live_stat.stat
+        if stat is None:
+            return
+        plottab.show_stat(stat)
+        if (
+            settings.EARLY_STOP
+            and session.adaptive_stage is None
+            and plottab.live_stat.captured(settings.EARLY_STOP_MARGIN)
+        ):
+            self.stand_msg(session, 'Резонанс пройден, измерение остановлено')
+            self.data_transfer_finished(session)
+
+    @pyqtSlot(QObject, object)
+    def update_metrics(self, session: StandSession, metrics) -> None:
+        """Показывает скорость сбора данных выбранного стенда и сохраняет
+        показатели всех проходов в записи рабочей вкладки."""
+        if session is self.session:
+            self.show_metrics(metrics)
+        if session.plottab is not None:
+            session.plottab.record.metrics = json.dumps(
+                [item.to_dict() for item in session.metrics])
+        if metrics.finished_at:
+            self.stand_msg(session, f'Сбор данных: {metrics.summary()}')
+
+    def show_metrics(self, metrics=None) -> None:
+        """Скорость сбора данных рядом с progressbar, подробности - во
+        всплывающей подсказке."""
+        if metrics is None:
+            self.metrics_label.clear()
+            self.metrics_label.setToolTip('')
+            return
+        self.metrics_label.setText(f'{metrics.rate:.0f} точек/с')
+        self.metrics_label.setToolTip(metrics.summary())
+
+    @pyqtSlot(QObject, bool)
+    def stand_port_checked(self, session: StandSession, status: bool) -> None:  # noqa
+        """Обновляет состояние стенда в списке стендов и, если стенд
+        выбран, виджеты COM-порта."""
+        index = self.sessions.index(session)
+        pixmap = self.connect_pixmap if status else self.disconnect_pixmap
+        text = session.port_name
+        factory_number = session.serial_manager.factory_number
+        if status and factory_number is not None:
+            text = f'{text} - № {factory_number}'
+        self.stand_combobox.setItemIcon(index, QIcon(pixmap))
+        self.stand_combobox.setItemText(index, text)
+        if session is self.session and not session.transfer_status:
+            self.update_serial_port_interface(status)
+
+    @pyqtSlot(int)
+    def stand_combobox_changed(self, index: int) -> None:
+        """Выбор стенда, которым управляют виджеты основного окна."""
+        if index == -1:
+            return
+        session = self.sessions[index]
+        self.session = session
+        self.progressbar.setMaximum(session.progress_maximum or 100)
+        self.progressbar.setValue(session.progress_value)
+        self.show_metrics(session.metrics[-1] if session.metrics else None)
+        if not session.transfer_status:
+            self.update_serial_port_interface(session.connected)
+            return
+        self.startstop_button.setEnabled(True)
+        self.startstop_button.setIcon(set_icon('icons/stop.png'))
+        self.toggle_serial_interface(False)
+        self.tabwidget.setCurrentWidget(session.plottab.page)
 
     @pyqtSlot(bool)
     def update_serial_port_interface(self, status) -> None:
@@ -1553,7 +1792,7 @@ class MainWindow(QMainWindow):
         if self.settings_window.isVisible():
             self.settings_window.hide()
             return
-        serial_ports: list = self.serial_manager.get_available_port_names()
+        serial_ports: list = SerialPortManager.get_available_port_names()
         self.settings_window.update_window_widgets(serial_ports)
         self.settings_window.show()
 
@@ -1574,6 +1813,13 @@ class MainWindow(QMainWindow):
             records, self.tabwidget)
         self.compare_mode_window.show()
 
+    @pyqtSlot(list, object)
+    def compare_records(self, records, load_data) -> None:
+        """Сравнение записей, выгруженных из таблицы с эскизами."""
+        self.compare_mode_window: CompareModedWindow = CompareModedWindow(
+            records, self.tabwidget, load_data)
+        self.compare_mode_window.show()
+
     @pyqtSlot()
     def table_button_clicked(self) -> None:
         """Слот нажатия кнопки вывода таблицы базы данных."""
@@ -1634,6 +1880,10 @@ class MainWindow(QMainWindow):
         self.check_db_status_thread.quit()
         self.check_db_status_thread.wait()
 
+        self.stand_discovery_timer.stop()
+        for session in self.sessions:
+            session.quit()
+
         if self.settings_window:
             self.settings_window.close()
         if self.table_window:
@@ -1647,6 +1897,12 @@ class MainWindow(QMainWindow):
         current_time: str = datetime.now().time().strftime('%H:%M:%S')
         self.terminal.append(f'{current_time} - {message}')
 
+    def stand_msg(self, session: StandSession, message: str) -> None:
+        """Сообщение в терминал с именем порта, если стендов несколько."""
+        if len(self.sessions) > 1:
+            message = f'{session.port_name}: {message}'
+        self.terminal_msg(message)
+
     @pyqtSlot()
     def terminal_button_clicked(self) -> None:
         self.terminal.setVisible(not self.terminal.isVisible())
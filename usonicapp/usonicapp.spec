@@ -9,13 +9,21 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[
+        ('adaptive.py', '.'),
+        ('archive.py', '.'),
         ('constants.py', '.'),
         ('calc_stat.py', '.'),
+        ('calc_stat_exact.py', '.'),
         ('config.py', '.'),
+        ('converter.py', '.'),
+        ('datacodec.py', '.'),
         ('database.py', '.'),
+        ('freqplan.py', '.'),
+        ('journal.py', '.'),
         ('models.py', '.'),
         ('plottab.py', '.'),
         ('serialport.py', '.'),
+        ('stand.py', '.'),
         ('widgets.py', '.'),
         ('qbstyles/styles/', './qbstyles/styles/'),
         ('forms/', './forms/'),